@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Compares the cached strip gradient engine with the former per-line drawing.
+
+Usage: python3 benchmarks/bench_gradient.py [--repeat N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+import steam_shortcut_manager as ssm  # noqa: E402
+
+
+def create_gradient_image_linewise(
+    width, height, color_start_rgb, color_end_rgb, direction="vertical"
+):
+    """The former implementation: one draw.line call per row or column."""
+    base = Image.new("RGB", (width, height), color_start_rgb)
+    draw = ImageDraw.Draw(base)
+    if direction == "vertical":
+        for y in range(height):
+            blend = y / float(height)
+            r = int(color_start_rgb[0] * (1 - blend) + color_end_rgb[0] * blend)
+            g = int(color_start_rgb[1] * (1 - blend) + color_end_rgb[1] * blend)
+            b = int(color_start_rgb[2] * (1 - blend) + color_end_rgb[2] * blend)
+            draw.line([(0, y), (width, y)], fill=(r, g, b))
+    elif direction == "horizontal":
+        for x in range(width):
+            blend = x / float(width)
+            r = int(color_start_rgb[0] * (1 - blend) + color_end_rgb[0] * blend)
+            g = int(color_start_rgb[1] * (1 - blend) + color_end_rgb[1] * blend)
+            b = int(color_start_rgb[2] * (1 - blend) + color_end_rgb[2] * blend)
+            draw.line([(x, 0), (x, height)], fill=(r, g, b))
+    return base
+
+
+def time_call(func, repeat):
+    """Returns the best wall time of 'repeat' calls in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    colors = (ssm.GRADIENT_COLOR_START, ssm.GRADIENT_COLOR_END)
+    print(
+        f"{'target':<24} {'direction':<10} {'linewise':>10} {'uncached':>10} {'cached':>10}"
+    )
+    for target_name, (width, height) in ssm.TARGET_SIZES.items():
+        for direction in ("horizontal", "vertical"):
+            expected = create_gradient_image_linewise(width, height, *colors, direction)
+            if ssm.create_gradient_image(
+                width, height, *colors, direction
+            ).tobytes() != (expected.tobytes()):
+                print(
+                    f"ERROR: {target_name}/{direction} differs from the linewise output"
+                )
+                return 1
+
+            linewise_ms = time_call(
+                lambda: create_gradient_image_linewise(
+                    width, height, *colors, direction
+                ),
+                args.repeat,
+            )
+
+            def uncached():
+                ssm._cached_gradient_canvas.cache_clear()
+                ssm.create_gradient_image(width, height, *colors, direction)
+
+            uncached_ms = time_call(uncached, args.repeat)
+            ssm.create_gradient_image(width, height, *colors, direction)
+            cached_ms = time_call(
+                lambda: ssm.create_gradient_image(width, height, *colors, direction),
+                args.repeat,
+            )
+            print(
+                f"{target_name:<24} {direction:<10} {linewise_ms:>8.2f}ms {uncached_ms:>8.2f}ms {cached_ms:>8.2f}ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
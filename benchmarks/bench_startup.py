@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Measures startup cost (python -X importtime and wall time) of every action.
+
+Each action runs as a fresh interpreter against a throwaway Steam tree in a
+temporary HOME, the daemon is bypassed. Exits non-zero if 'check' exceeds the
+wall time budget or imports Pillow.
+
+Usage: python3 benchmarks/bench_startup.py [--repeat N] [--check-budget-ms MS]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+SCRIPT = Path(__file__).resolve().parent.parent / "src" / "steam_shortcut_manager.py"
+APPID_TAG = "org.example.Startup"
+LOGINUSERS_VDF = '"users"\n{\n\t"12345"\n\t{\n\t\t"Timestamp"\t\t"1700000000"\n\t}\n}\n'
+
+
+def make_steam_home(home: Path) -> Path:
+    """Creates a minimal Steam tree for user 12345 and returns the icon path."""
+    steam = home / ".local/share/Steam"
+    (steam / "userdata/12345/config").mkdir(parents=True)
+    (steam / "config").mkdir(parents=True)
+    (steam / "userdata/12345/config/localconfig.vdf").write_text(
+        '"UserLocalConfigStore" {}\n'
+    )
+    (steam / "config/loginusers.vdf").write_text(LOGINUSERS_VDF)
+    icon_path = home / "icon.png"
+    Image.new("RGBA", (256, 256), (200, 50, 50, 255)).save(icon_path)
+    return icon_path
+
+
+def run_action(action_args, env):
+    """Runs one action, returns (wall ms, import ms, imported module names)."""
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", str(SCRIPT), *action_args, "--no-daemon"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if completed.returncode not in (0, 1):
+        sys.exit(f"ERROR: {' '.join(action_args)} failed:\n{completed.stderr}")
+    import_us = 0
+    modules = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # top level imports only
+            import_us += int(cumulative)
+    return wall_ms, import_us / 1000.0, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--check-budget-ms",
+        type=float,
+        default=150.0,
+        help="Maximum best-of wall time for 'check' in milliseconds.",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home_dir:
+        home = Path(home_dir)
+        icon_path = make_steam_home(home)
+        env = dict(os.environ, HOME=str(home), XDG_RUNTIME_DIR=str(home))
+        env.pop("XDG_CACHE_HOME", None)
+        tag_args = ["--appid_tag", APPID_TAG]
+        add_args = ["--action", "add", *tag_args, "--name", "Startup"]
+        add_args += ["--icon", str(icon_path), "--params", f"run {APPID_TAG}"]
+        # add and remove alternate, so every add really adds and every remove
+        # really removes; check runs against the existing shortcut.
+        actions = [
+            ("add", add_args),
+            ("check", ["--action", "check", *tag_args]),
+            ("remove", ["--action", "remove", *tag_args]),
+        ]
+
+        results = {name: [] for name, _ in actions}
+        for _ in range(args.repeat):
+            for name, action_args in actions:
+                results[name].append(run_action(action_args, env))
+
+    print(f"{'action':<8} {'wall':>10} {'imports':>10}  pillow")
+    failed = False
+    for name, runs in results.items():
+        wall_ms = min(run[0] for run in runs)
+        import_ms = min(run[1] for run in runs)
+        imports_pil = any("PIL" in run[2] for run in runs)
+        print(
+            f"{name:<8} {wall_ms:>8.1f}ms {import_ms:>8.1f}ms  {'yes' if imports_pil else 'no'}"
+        )
+        if name == "check":
+            if imports_pil:
+                print("ERROR: 'check' imports Pillow.")
+                failed = True
+            if wall_ms > args.check_budget_ms:
+                print(
+                    f"ERROR: 'check' took {wall_ms:.1f}ms, budget is {args.check_budget_ms:.1f}ms."
+                )
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark suite for shortcuts.vdf operations and artwork rendering at scale.
+
+Runs offline against temporary userdata trees: add_shortcut, remove_shortcut,
+check_shortcut and list_shortcuts on synthetic shortcuts.vdf files with 10, 1k and 10k
+entries, and save_steam_artwork (in total, with a single render thread and per
+artwork target) for small, medium and huge source logos. Every case runs in a fresh process so its peak
+memory can be reported. The suite runs several times and the minimum of each
+metric is kept; the spread between the runs is stored with the baseline as the
+noise of that metric. Results are compared against stored baselines and
+regressions beyond the tolerance and the noise are flagged (exit code 1).
+
+Usage: python3 benchmarks/bench_suite.py [--runs N] [--repeat N] [--tolerance 0.5]
+       python3 benchmarks/bench_suite.py --save-baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import steam_shortcut_manager as ssm  # noqa: E402
+from vdf_corpus import make_shortcuts  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines.json"
+VDF_SIZES = {"10": 10, "1k": 1000, "10k": 10000}
+LOGO_SIZES = {"small": 256, "medium": 1024, "huge": 8192}
+# Differences below these floors are noise, whatever the ratio.
+NOISE_FLOOR_MS = 1.0
+NOISE_FLOOR_MIB = 2.0
+
+
+def best_ms(func, repeat):
+    """Returns the best wall time of 'repeat' calls in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def make_logo(path: Path, size: int):
+    """Writes a square RGBA logo with a transparent border."""
+    logo = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(logo)
+    draw.ellipse((size // 10, size // 10, size * 9 // 10, size * 9 // 10), "#c83232")
+    draw.rectangle((size // 3, size // 3, size * 2 // 3, size * 2 // 3), "#f0f0f0")
+    logo.save(path)
+
+
+def vdf_case(label: str, count: int, repeat: int) -> dict:
+    """Times the shortcut actions on a shortcuts.vdf with 'count' entries."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.environ["XDG_CACHE_HOME"] = str(Path(temp_dir) / "cache")
+        userdata = Path(temp_dir) / "userdata/12345"
+        shortcuts_path = userdata / "config/shortcuts.vdf"
+        shortcuts_path.parent.mkdir(parents=True)
+        shortcuts_path.write_bytes(ssm.dump_binary_vdf(make_shortcuts(count)))
+        existing_tag = "org.synthetic.App0"
+        new_tag = "org.synthetic.Benchmark"
+
+        index_path = ssm.shortcuts_index_path(shortcuts_path)
+
+        def cold_check():
+            index_path.unlink(missing_ok=True)
+            assert ssm.check_shortcut(userdata, existing_tag)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            index_build_ms = best_ms(cold_check, repeat)
+            # add, check and remove alternate, so every call does real work.
+            actions = {
+                "add": lambda: ssm.add_shortcut(
+                    userdata, new_tag, "Benchmark", ssm.DEFAULT_EXE, "run", ""
+                ),
+                "check": lambda: ssm.check_shortcut(userdata, new_tag),
+                "remove": lambda: ssm.remove_shortcut(userdata, new_tag),
+            }
+            timings = {action: float("inf") for action in actions}
+            for _ in range(repeat):
+                for action, call in actions.items():
+                    timings[action] = min(timings[action], best_ms(call, 1))
+            assert not ssm.check_shortcut(userdata, new_tag)
+            list_ms = best_ms(
+                lambda: ssm.list_shortcuts(userdata, output_stream=io.StringIO()),
+                repeat,
+            )
+
+    prefix = f"vdf/{label}"
+    return {
+        f"{prefix}/index_build_ms": index_build_ms,
+        f"{prefix}/add_ms": timings["add"],
+        f"{prefix}/check_ms": timings["check"],
+        f"{prefix}/remove_ms": timings["remove"],
+        f"{prefix}/list_ms": list_ms,
+        f"{prefix}/peak_rss_mib": ssm.peak_rss_mib(),
+    }
+
+
+def artwork_case(label: str, logo_path: str, repeat: int) -> dict:
+    """Times save_steam_artwork and each artwork target for one source logo."""
+    prefix = f"artwork/{label}"
+    metrics = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.environ["XDG_CACHE_HOME"] = str(Path(temp_dir) / "cache")
+        renders = iter(range(repeat))
+
+        def save_to_fresh_grid():
+            # A new grid directory each time, so the artwork cache never hits.
+            grid_dir = Path(temp_dir) / f"userdata/{next(renders)}/config/grid"
+            assert ssm.save_steam_artwork("1234567890", logo_path, grid_dir)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Full renders first, so the peak memory is the one of a real run.
+            metrics[f"{prefix}/save_ms"] = best_ms(save_to_fresh_grid, repeat)
+            metrics[f"{prefix}/peak_rss_mib"] = ssm.peak_rss_mib()
+            # The same with the targets rendered one after another.
+            renders = iter(range(repeat, 2 * repeat))
+            ssm.configure_render_threads(1)
+            metrics[f"{prefix}/save_1_thread_ms"] = best_ms(save_to_fresh_grid, repeat)
+            ssm.configure_render_threads(None)
+
+        bboxes = [ssm.app_logo_bbox(target_name) for target_name in ssm.TARGET_SIZES]
+        metrics[f"{prefix}/decode_ms"] = best_ms(
+            lambda: ssm.SourceLogo(Path(logo_path), bboxes), repeat
+        )
+        source_logo = ssm.SourceLogo(Path(logo_path), bboxes)
+        for target_name in ssm.TARGET_SIZES:
+
+            def render_and_encode():
+                canvas = ssm.render_artwork_target(target_name, source_logo)
+                canvas.save(io.BytesIO(), "PNG")
+
+            metrics[f"{prefix}/{target_name}_ms"] = best_ms(render_and_encode, repeat)
+    return metrics
+
+
+def run_isolated(pool_context, func, *args) -> dict:
+    """Runs one case in a fresh process, so peak memory is per case."""
+    with pool_context.Pool(1) as pool:
+        return pool.apply(func, args)
+
+
+def run_suite(pool_context, repeat: int) -> dict:
+    """Runs every case once, each in a fresh process, and returns all metrics."""
+    metrics = {}
+    for label, count in VDF_SIZES.items():
+        print(f"INFO: shortcuts.vdf with {count} entries", flush=True)
+        metrics.update(run_isolated(pool_context, vdf_case, label, count, repeat))
+    with tempfile.TemporaryDirectory() as logo_dir:
+        for label, size in LOGO_SIZES.items():
+            print(f"INFO: {size}x{size} source logo", flush=True)
+            logo_path = Path(logo_dir) / f"{label}.png"
+            # Not in this process: spawned cases inherit its peak RSS.
+            run_isolated(pool_context, make_logo, logo_path, size)
+            metrics.update(
+                run_isolated(pool_context, artwork_case, label, str(logo_path), repeat)
+            )
+    return metrics
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list:
+    """Prints current vs. baseline metrics, returns the regressed metric names.
+
+    A metric regresses when it grew beyond the tolerance and by more than its
+    noise floor: the fixed floor or the spread recorded with the baseline,
+    whichever is larger.
+    """
+    regressions = []
+    noise = baseline.get("noise", {})
+    print(f"{'metric':<44} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, value in current.items():
+        reference = baseline["metrics"].get(name)
+        if reference is None:
+            print(f"{name:<44} {'-':>10} {value:>10.2f} {'new':>8}")
+            continue
+        change = (value / reference - 1) if reference else 0.0
+        floor = max(
+            NOISE_FLOOR_MIB if name.endswith("_mib") else NOISE_FLOOR_MS,
+            noise.get(name, 0.0),
+        )
+        regressed = change > tolerance and value - reference > floor
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<44} {reference:>10.2f} {value:>10.2f} {change:>+7.0%}{'  REGRESSION' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=3,
+        help="Runs of the whole suite; the minimum of each metric is kept.",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the new baseline instead of comparing.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Allowed slowdown or memory growth as a fraction of the baseline.",
+    )
+    args = parser.parse_args()
+
+    # Spawned workers start from a clean interpreter: no inherited peak RSS.
+    pool_context = multiprocessing.get_context("spawn")
+    runs = []
+    for run in range(args.runs):
+        print(f"INFO: Run {run + 1}/{args.runs}", flush=True)
+        runs.append(run_suite(pool_context, args.repeat))
+    current = {name: min(run[name] for run in runs) for name in runs[0]}
+    spread = {name: max(run[name] for run in runs) - current[name] for name in runs[0]}
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "machine": f"{platform.machine()} {platform.python_version()} "
+                    f"{os.cpu_count()} CPU(s)",
+                    "metrics": {name: round(v, 3) for name, v in current.items()},
+                    "noise": {name: round(v, 3) for name, v in spread.items()},
+                },
+                f,
+                indent=1,
+            )
+            f.write("\n")
+        print(f"INFO: Baseline written to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except OSError:
+        print(f"WARNING: No baseline at {args.baseline}, nothing to compare.")
+        baseline = {"metrics": {}, "noise": {}}
+    print(f"INFO: Baseline recorded on {baseline.get('machine', 'unknown machine')}")
+    regressions = compare(baseline, current, args.tolerance)
+    if regressions:
+        print(
+            f"ERROR: {len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
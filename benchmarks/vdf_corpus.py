@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Synthetic shortcuts.vdf corpus and equivalence check of the built-in codec.
+
+Every sample is encoded with the vdf package and with the tool's own binary VDF
+codec. Both must produce identical bytes and decode to identical data, and the
+record level operations (append, remove, tag index) must match what a full
+vdf.binary_load / vdf.binary_dump cycle produces.
+
+Usage: python3 benchmarks/vdf_corpus.py
+"""
+
+import sys
+from pathlib import Path
+
+import vdf
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+import steam_shortcut_manager as ssm  # noqa: E402
+
+
+def make_shortcut_entry(index, appid_tag=None):
+    """Returns a shortcut entry as Steam and this tool write it."""
+    name = f"Synthetic App {index}"
+    exe = f'"/opt/synthetic/app{index}/start.sh"'
+    entry = {
+        "appid": ssm.generate_appid_for_vdf_entry(exe.strip('"'), name),
+        "AppName": name,
+        "Exe": exe,
+        "StartDir": f'"/opt/synthetic/app{index}/"',
+        "icon": "",
+        "ShortcutPath": "",
+        "LaunchOptions": f"--profile {index}",
+        "IsHidden": 0,
+        "AllowDesktopConfig": 1,
+        "AllowOverlay": 1,
+        "OpenVR": 0,
+        "Devkit": 0,
+        "DevkitGameID": "",
+        "DevkitOverrideAppID": 0,
+        "LastPlayTime": 1700000000 + index,
+        "FlatpakAppID": "",
+        "tags": {},
+    }
+    if appid_tag:
+        entry["FlatpakAppID"] = appid_tag
+        entry["tags"] = {"0": f"{ssm.TAG_PREFIX}_{appid_tag}"}
+    return entry
+
+
+def make_shortcuts(count, ssm_every=2):
+    """Returns a wrapped shortcuts structure; every n-th entry is SSM tagged."""
+    return {
+        "shortcuts": {
+            str(index): make_shortcut_entry(
+                index, f"org.synthetic.App{index}" if index % ssm_every == 0 else None
+            )
+            for index in range(count)
+        }
+    }
+
+
+def corpus():
+    """Yields (name, data for the vdf package, data for the built-in codec)."""
+    yield "empty root", {}, {}
+    yield "empty shortcuts", {"shortcuts": {}}, {"shortcuts": {}}
+    yield "single entry", make_shortcuts(1), make_shortcuts(1)
+    yield "hundred entries", make_shortcuts(100), make_shortcuts(100)
+    unicode_data = make_shortcuts(3)
+    unicode_data["shortcuts"]["1"]["AppName"] = "Spiel für Größen — ゲーム"
+    unicode_data["shortcuts"]["2"]["tags"] = {
+        "0": "favorite",
+        "1": "SSM_org.unicode.Ä",
+        "2": "",
+    }
+    yield "unicode and multiple tags", unicode_data, unicode_data
+    decoy = make_shortcuts(4)
+    decoy["shortcuts"]["1"]["AppName"] = "SSM_org.synthetic.App2"
+    decoy["shortcuts"]["1"]["LaunchOptions"] = "SSM_org.synthetic.App2"
+    yield "tag text in other fields", decoy, decoy
+    unwrapped = make_shortcuts(5)["shortcuts"]
+    yield "unwrapped entries", unwrapped, unwrapped
+    nested = make_shortcuts(2)
+    nested["shortcuts"]["0"]["extra"] = {"empty": {}, "deep": {"level": {"x": 1}}}
+    nested["shortcuts"]["1"]["ratio"] = 0.5
+    nested["shortcuts"]["1"]["negative"] = -12345
+    yield "nested maps, floats, negative ints", nested, nested
+    yield (
+        "special integer types",
+        {
+            "shortcuts": {
+                "0": {
+                    "big": vdf.UINT_64(2**63 + 5),
+                    "signed": vdf.INT_64(-(2**40)),
+                    "pointer": vdf.POINTER(7),
+                    "color": vdf.COLOR(255),
+                }
+            }
+        },
+        {
+            "shortcuts": {
+                "0": {
+                    "big": ssm.VdfUInt64(2**63 + 5),
+                    "signed": ssm.VdfInt64(-(2**40)),
+                    "pointer": ssm.VdfPointer(7),
+                    "color": ssm.VdfColor(255),
+                }
+            }
+        },
+    )
+
+
+def check_sample(name, vdf_data, ssm_data):
+    """Returns a list of mismatches for one corpus sample."""
+    failures = []
+    expected = vdf.binary_dumps(vdf_data)
+    encoded = ssm.dump_binary_vdf(ssm_data)
+    if encoded != expected:
+        failures.append("dump differs from vdf.binary_dumps")
+    if ssm.parse_binary_vdf(expected) != vdf.binary_loads(expected):
+        failures.append("parse differs from vdf.binary_loads")
+
+    scan = ssm.ShortcutsVdfScan(expected)
+    shortcuts = vdf_data.get("shortcuts", vdf_data)
+    if [key for key, _, _ in scan.records()] != list(shortcuts):
+        failures.append("record keys differ")
+    decoded = vdf.binary_loads(expected)
+    decoded_shortcuts = decoded["shortcuts"] if "shortcuts" in decoded else decoded
+    for key, start, end in scan.records():
+        if scan.entry(start, end) != decoded_shortcuts[key]:
+            failures.append(f"record {key} decodes differently")
+
+    new_entry = make_shortcut_entry(9999, "org.synthetic.Appended")
+    combined = dict(shortcuts)
+    combined["9999"] = new_entry
+    appended = (
+        expected[: scan.body_end()]
+        + ssm.encode_binary_vdf_field("9999", new_entry)
+        + expected[scan.body_end() :]
+    )
+    wrapped_combined = {"shortcuts": combined} if scan.wrapped else combined
+    if expected and appended != vdf.binary_dumps(wrapped_combined):
+        failures.append("append differs from a full dump")
+
+    for key, start, end in scan.records():
+        remaining = {k: v for k, v in shortcuts.items() if k != key}
+        wrapped_remaining = {"shortcuts": remaining} if scan.wrapped else remaining
+        spliced = expected[:start] + expected[end:]
+        if spliced != vdf.binary_dumps(wrapped_remaining) and remaining:
+            failures.append(f"removing record {key} differs from a full dump")
+
+    index = ssm.build_shortcuts_index(expected, [0, 0, 0])
+    expected_tags: dict = {}
+    for key, entry in shortcuts.items():
+        for tag in entry.get("tags", {}).values() if isinstance(entry, dict) else ():
+            if tag.startswith(f"{ssm.TAG_PREFIX}_"):
+                expected_tags.setdefault(tag, [])
+                if key not in expected_tags[tag]:
+                    expected_tags[tag].append(key)
+    if index["tags"] != expected_tags:
+        failures.append("index tags differ from the records carrying them")
+    if index["body_end"] != scan.body_end():
+        failures.append("index body_end differs from the scan")
+    return failures
+
+
+def main():
+    failed = False
+    for name, vdf_data, ssm_data in corpus():
+        failures = check_sample(name, vdf_data, ssm_data)
+        print(f"{'FAIL' if failures else 'ok  '} {name}")
+        for failure in failures:
+            print(f"     - {failure}")
+        failed = failed or bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
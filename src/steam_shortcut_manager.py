@@ -1,28 +1,43 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from __future__ import annotations
+
 import argparse
+import contextlib
+import fcntl
+import functools
+import hashlib
+import io
+import json
+import mmap
 import os
+import re
+import resource
+import shutil
+import signal
 import sys
 import struct
-import binascii
+import time
 import zlib
-import vdf
 from pathlib import Path
-from typing import List, Optional  # Importiere List und Optional für Type Hinting
-
-try:
-    from PIL import Image, ImageDraw, ImageOps
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)  # Importiere List und Optional für Type Hinting
 
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-    print(
-        "WARNING: Pillow (PIL) library not found. Artwork processing will be skipped.",
-        file=sys.stderr,
-    )
+# Pillow, vdf, concurrent.futures and the socket modules are imported where they
+# are used, so 'check' and 'remove' do not pay for them at startup.
+if TYPE_CHECKING:
+    from PIL import Image
 
-_crc32_tab_manual: List[int] = []  # mypy fix: Type annotation hinzugefügt
 TARGET_SIZES = {
     "library_header_capsule": (920, 430),
     "portrait": (600, 900),
@@ -32,94 +47,417 @@ TARGET_SIZES = {
 }
 GRADIENT_COLOR_START = (40, 40, 60)
 GRADIENT_COLOR_END = (20, 20, 30)
+# Adaptive gradients (--gradient adaptive): the logo's dominant color is found
+# on a thumbnail of this size, reduced to a few colors, and scaled so that its
+# brightest channel matches these values at the start and end of the gradient.
+GRADIENT_SAMPLE_SIZE = 64
+GRADIENT_SAMPLE_COLORS = 8
+GRADIENT_ADAPTIVE_BRIGHTNESS = (90, 40)
+GRADIENT_COLORS_CACHE_NAME = "gradient-colors.json"
+GRADIENT_COLORS_CACHE_VERSION = 1
+# Icons remembered in the gradient colors cache; the oldest entries are dropped.
+GRADIENT_COLORS_CACHE_SIZE = 1024
 APP_LOGO_SCALE_FACTOR_LANDSCAPE = 0.75
 APP_LOGO_SCALE_FACTOR_PORTRAIT = 0.8
 APP_LOGO_SCALE_FACTOR_ICON = 0.8
+GRADIENT_CACHE_SIZE = 16
+ARTWORK_FILENAME_SUFFIXES = {
+    "library_header_capsule": "",
+    "portrait": "p",
+    "hero": "_hero",
+    "icon_square": "_icon",
+    "logo_steam": "_logo",
+}
+ARTWORK_TARGET_LABELS = {
+    "library_header_capsule": "Library Header Capsule",
+    "portrait": "Portrait (p) image",
+    "hero": "Hero image",
+    "icon_square": "Icon image",
+    "logo_steam": "Steam Logo image",
+}
+WATERMARKED_TARGETS = ("library_header_capsule", "hero", "portrait")
+TRANSPARENT_TARGETS = ("icon_square", "logo_steam")
+# Output formats Steam accepts for grid artwork: (Pillow format, file extension).
+ARTWORK_FORMATS = {"png": ("PNG", ".png"), "jpeg": ("JPEG", ".jpg")}
+# Named encoder settings. Targets not listed under "formats" are saved as PNG;
+# the transparent icon and logo always are.
+ARTWORK_ENCODER_PROFILES: dict = {
+    "default": {
+        "formats": {},
+        "png_compress_level": 6,
+        "optimize": False,
+        "jpeg_quality": 90,
+    },
+    "fast": {
+        "formats": {target: "jpeg" for target in WATERMARKED_TARGETS},
+        "png_compress_level": 1,
+        "optimize": False,
+        "jpeg_quality": 90,
+    },
+    "small": {
+        "formats": {target: "jpeg" for target in WATERMARKED_TARGETS},
+        "png_compress_level": 9,
+        "optimize": True,
+        "jpeg_quality": 85,
+    },
+}
+REDUCIBLE_MODES = ("RGBA", "RGB", "LA", "L")
+# Like Pillow's reducing_gap: cheap box reductions stop at twice the target size,
+# LANCZOS does the rest, which keeps the result visually identical.
+PYRAMID_REDUCING_GAP = 2.0
+REDUCE_STRIPE_HEIGHT = 256  # must be even to keep reduce(2) stripes aligned
+ARTWORK_CACHE_MANIFEST_NAME = "ssm_artwork_cache.json"
+ARTWORK_CACHE_VERSION = 1
+WATERMARK_CACHE_DIR_NAME = "ssm_watermark_cache"
+# Scaled watermark variants kept in memory and as files in the cache directory.
+WATERMARK_CACHE_SIZE = 16
 TAG_PREFIX = "SSM"
+DEFAULT_EXE = "/usr/bin/flatpak"
+# Shortcut fields owned by this tool; 'sync' keeps all other fields as they are.
+SYNC_MANAGED_FIELDS = (
+    "appid",
+    "AppName",
+    "Exe",
+    "StartDir",
+    "icon",
+    "LaunchOptions",
+    "FlatpakAppID",
+)
+# Fields the 'list' action can output per shortcut, and the ones it outputs by default.
+LIST_FIELDS = (
+    "key",
+    "appid_tag",
+    "managed",
+    "name",
+    "exe",
+    "start_dir",
+    "params",
+    "icon",
+    "appid",
+    "artwork_id",
+    "tags",
+)
+LIST_DEFAULT_FIELDS = ("key", "appid_tag", "name", "exe", "params")
 
+SHORTCUTS_VDF_ROOT = b"\x00shortcuts\x00"
+SHORTCUTS_LOCK_SUFFIX = ".ssm-lock"
+BIN_NONE = b"\x00"
+BIN_END = b"\x08"
+BIN_NONE_TYPE = 0x00
+BIN_STRING_TYPE = 0x01
+BIN_WIDESTRING_TYPE = 0x05
+BIN_END_TYPE = 0x08
+BIN_INT32 = struct.Struct("<i")
+BIN_FLOAT32 = struct.Struct("<f")
+BIN_UINT64 = struct.Struct("<Q")
+BIN_INT64 = struct.Struct("<q")
+BIN_FIXED_SIZE_TYPES = {
+    0x02: BIN_INT32,
+    0x03: BIN_FLOAT32,
+    0x04: BIN_INT32,
+    0x06: BIN_INT32,
+    0x07: BIN_UINT64,
+    0x0A: BIN_INT64,
+}
 
-def find_steam_userdata_path() -> Optional[Path]:  # Rückgabetyp Optional[Path]
-    """Finds the most likely active Steam userdata directory."""
+CACHE_DIR_NAME = "steam-shortcut-manager"
+SHORTCUTS_INDEX_VERSION = 2
+DAEMON_SOCKET_NAME = "steam-shortcut-manager.sock"
+DAEMON_POLL_INTERVAL = 1.0
+DAEMON_CONNECT_TIMEOUT = 2.0
+# Generous enough for rendering the artwork of a huge logo on a busy machine.
+DAEMON_REQUEST_TIMEOUT = 120.0
+DAEMON_ACTIONS = ("add", "remove", "check")
+STEAM_PID_FILES = (
+    ".steam/steam.pid",
+    ".var/app/com.valvesoftware.Steam/.steam/steam.pid",
+)
+STEAM_PROCESS_NAMES = ("steam",)
+PENDING_OPERATIONS_NAME = "ssm_pending_operations.jsonl"
+# Result statuses of manifest operations that make the run fail.
+FAILED_STATUSES = ("invalid", "failed", "collision")
+STDIN_BATCH_WINDOW = 0.2  # seconds
+STDIN_BATCH_SIZE = 100
+STEAM_USERDATA_SUBPATHS = (
+    ".steam/root/userdata",
+    ".local/share/Steam/userdata",
+    ".steam/steam/userdata",
+    ".var/app/com.valvesoftware.Steam/data/Steam/userdata",
+)
+USERDATA_DISCOVERY_CACHE_NAME = "userdata-discovery.json"
+USERDATA_DISCOVERY_CACHE_VERSION = 1
+# (name, environment override, default path) of the Flatpak installations.
+FLATPAK_INSTALLATIONS = (
+    ("system", "FLATPAK_SYSTEM_DIR", "/var/lib/flatpak"),
+    ("user", "FLATPAK_USER_DIR", "~/.local/share/flatpak"),
+)
+HICOLOR_SIZE_DIR_PATTERN = re.compile(r"(\d+)x\1(?:@(\d+))?")
+
+# (short appid, source icon, grid directory, watermark) of one artwork render.
+ArtworkJob = Tuple[str, str, str, Optional[str]]
+
+# Encoder settings of the artwork, see configure_artwork_encoding().
+_artwork_encoding: dict = {}
+# Derive the gradient colors from each logo instead of the fixed ones.
+_adaptive_gradient = False
+# Threads rendering the targets of one app, None picks one per CPU core.
+_render_threads: Optional[int] = None
+# Output level (--log-level): quiet prints only warnings and errors, debug adds
+# DEBUG output. Debug-only filesystem probes are skipped below debug.
+LOG_LEVELS = {"quiet": 0, "info": 1, "debug": 2}
+LOG_LEVEL = LOG_LEVELS["info"]
+# Completed spans in Chrome trace event format, None while tracing is disabled.
+_trace_events: Optional[List[dict]] = None
+_TRACE_ORIGIN = time.perf_counter()
+
+
+def log_info(message: str):
+    """Prints an INFO line, unless the output level is quiet."""
+    if LOG_LEVEL >= LOG_LEVELS["info"]:
+        print(f"INFO: {message}")
+
+
+def debug_output() -> bool:
+    """Tells whether DEBUG output is enabled."""
+    return LOG_LEVEL >= LOG_LEVELS["debug"]
+
+
+def enable_tracing():
+    """Starts recording spans (--timings, --trace-file)."""
+    global _trace_events
+    if _trace_events is None:
+        _trace_events = []
+
+
+@contextlib.contextmanager
+def span(name: str, **trace_args) -> Iterator[None]:
+    """Records the wall time of the enclosed block as a named span."""
+    if _trace_events is None:
+        yield
+        return
+    import threading
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _trace_events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (started - _TRACE_ORIGIN) * 1e6,
+                "dur": (time.perf_counter() - started) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": trace_args,
+            }
+        )
+
+
+def traced(name: str):
+    """Decorator recording every call of a function as a span."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def print_timings():
+    """Prints the recorded spans summed up per name, in order of first use."""
+    totals = {}
+    for event in _trace_events or []:
+        count, duration = totals.get(event["name"], (0, 0.0))
+        totals[event["name"]] = (count + 1, duration + event["dur"])
+    for name, (count, duration) in totals.items():
+        print(f"TIMING: {name:<20} {count:>5} call(s) {duration / 1000:>10.2f} ms")
+    print(
+        f"TIMING: {'total':<20} {'':>13} {(time.perf_counter() - _TRACE_ORIGIN) * 1000:>10.2f} ms"
+    )
+
+
+def write_trace_file(trace_path: Path):
+    """Writes the recorded spans as a Chrome trace (chrome://tracing, Perfetto)."""
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"traceEvents": _trace_events or [], "displayTimeUnit": "ms"}, f, indent=0
+        )
+    log_info(f"Trace written to {trace_path}")
+
+
+def steam_userdata_base_paths() -> List[Path]:
+    """Returns the userdata directories of all known Steam installation layouts."""
     home = Path.home()
-    steam_paths_to_check = [
-        home / ".steam/root/userdata",
-        home / ".local/share/Steam/userdata",
-        home / ".steam/steam/userdata",
-        home / ".var/app/com.valvesoftware.Steam/data/Steam/userdata",
-    ]
-    candidate_user_dirs: List[dict] = []  # Expliziter Typ für leere Liste
-    for steam_base_path in steam_paths_to_check:
-        if steam_base_path.is_dir():
-            for user_id_dir in steam_base_path.iterdir():
-                if user_id_dir.is_dir() and user_id_dir.name.isdigit():
-                    localconfig_vdf = user_id_dir / "config" / "localconfig.vdf"
-                    if localconfig_vdf.is_file():
-                        try:
-                            mtime = localconfig_vdf.stat().st_mtime
-                            candidate_user_dirs.append(
-                                {
-                                    "path": user_id_dir,
-                                    "mtime": mtime,
-                                    "steam_base": steam_base_path,
-                                    "user_id_str": user_id_dir.name,
-                                }
-                            )
-                        except OSError:
-                            pass
-    if not candidate_user_dirs:
+    return [home / subpath for subpath in STEAM_USERDATA_SUBPATHS]
+
+
+def _mtime_ns_or_none(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
         return None
 
+
+def find_steam_user_dirs(dependencies: Optional[dict] = None) -> List[dict]:
+    """Lists the numeric userdata directories having a localconfig.vdf.
+
+    Directories reachable through several base paths (e.g. the ~/.steam/root
+    symlink) are listed once. The most recently used directory comes first. If
+    'dependencies' is given, the mtime of every path the result depends on is
+    recorded in it (None for missing paths).
+    """
+    candidate_user_dirs: List[dict] = []  # Expliziter Typ für leere Liste
+    seen_dirs = set()
+    for steam_base_path in steam_userdata_base_paths():
+        if dependencies is not None:
+            dependencies[str(steam_base_path)] = _mtime_ns_or_none(steam_base_path)
+        if not steam_base_path.is_dir():
+            continue
+        for user_id_dir in steam_base_path.iterdir():
+            if not (user_id_dir.is_dir() and user_id_dir.name.isdigit()):
+                continue
+            localconfig_vdf = user_id_dir / "config" / "localconfig.vdf"
+            mtime_ns = _mtime_ns_or_none(localconfig_vdf)
+            if dependencies is not None:
+                dependencies[str(localconfig_vdf)] = mtime_ns
+            real_dir = user_id_dir.resolve()
+            if mtime_ns is None or real_dir in seen_dirs:
+                continue
+            seen_dirs.add(real_dir)
+            candidate_user_dirs.append(
+                {
+                    "path": user_id_dir,
+                    "mtime": mtime_ns,
+                    "steam_base": steam_base_path,
+                    "user_id_str": user_id_dir.name,
+                }
+            )
     candidate_user_dirs.sort(key=lambda x: x["mtime"], reverse=True)
+    return candidate_user_dirs
+
+
+def read_login_timestamps(loginusers_path: Path) -> dict:
+    """Returns {user id: last login timestamp} from a loginusers.vdf file."""
+    import vdf
+
+    with open(loginusers_path, "r", encoding="utf-8") as f:
+        login_users_data = vdf.load(f)
+    timestamps = {}
+    for user_id_str, user_details in login_users_data.get("users", {}).items():
+        if user_details and isinstance(user_details, dict):
+            timestamps[user_id_str] = int(user_details.get("Timestamp", 0))
+    return timestamps
+
+
+def userdata_discovery_cache_path() -> Path:
+    """Returns the location of the cached userdata discovery result."""
+    return ssm_cache_dir() / USERDATA_DISCOVERY_CACHE_NAME
+
+
+def load_cached_userdata_path() -> Optional[Path]:
+    """Returns the cached discovery result if none of the files it was derived
+    from changed since, without walking the userdata directories."""
+    try:
+        with open(userdata_discovery_cache_path(), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(cached, dict)
+        or cached.get("version") != USERDATA_DISCOVERY_CACHE_VERSION
+        or cached.get("home") != str(Path.home())
+        or not isinstance(cached.get("dependencies"), dict)
+    ):
+        return None
+    for path_str, mtime_ns in cached["dependencies"].items():
+        if _mtime_ns_or_none(Path(path_str)) != mtime_ns:
+            return None
+    userdata_path = Path(cached.get("userdata", ""))
+    return userdata_path if userdata_path.is_dir() else None
+
+
+def save_cached_userdata_path(userdata_path: Path, dependencies: dict):
+    """Persists a discovery result; failing to do so only costs a walk later."""
+    cache_path = userdata_discovery_cache_path()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": USERDATA_DISCOVERY_CACHE_VERSION,
+                    "home": str(Path.home()),
+                    "dependencies": dependencies,
+                    "userdata": str(userdata_path),
+                },
+                f,
+            )
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"WARNING: Could not save userdata discovery cache {cache_path}: {e}")
+
+
+@traced("discovery")
+def find_steam_userdata_path() -> Optional[Path]:  # Rückgabetyp Optional[Path]
+    """Finds the most likely active Steam userdata directory.
+
+    The result is cached and reused as long as the userdata directories, the
+    localconfig.vdf files and the loginusers.vdf files it was derived from are
+    unchanged.
+    """
+    cached_user_dir = load_cached_userdata_path()
+    if cached_user_dir:
+        log_info(f"Using cached Steam user directory: {cached_user_dir}")
+        return cached_user_dir
+
+    dependencies: dict = {}
+    candidate_user_dirs = find_steam_user_dirs(dependencies)
+    if not candidate_user_dirs:
+        return None
 
+    # Each loginusers.vdf is parsed once, however many users it lists.
+    login_timestamps_by_file: dict = {}
     latest_login_timestamp: int = 0  # Expliziter Typ
     active_user_dir_from_login: Optional[Path] = None  # Expliziter Typ
     for candidate in candidate_user_dirs:
         loginusers_path = candidate["steam_base"].parent / "config/loginusers.vdf"
-        user_id_str_candidate = candidate["user_id_str"]
-        try:
-            if loginusers_path.is_file():
-                with open(loginusers_path, "r", encoding="utf-8") as f:
-                    login_users_data = vdf.load(f)
-                user_details = login_users_data.get("users", {}).get(
-                    user_id_str_candidate
+        if loginusers_path not in login_timestamps_by_file:
+            dependencies[str(loginusers_path)] = _mtime_ns_or_none(loginusers_path)
+            login_timestamps_by_file[loginusers_path] = {}
+            try:
+                if loginusers_path.is_file():
+                    login_timestamps_by_file[loginusers_path] = read_login_timestamps(
+                        loginusers_path
+                    )
+            except Exception as e:
+                print(
+                    f"WARNING: Could not process {loginusers_path}: {e}",
+                    file=sys.stderr,
                 )
-                if user_details and isinstance(user_details, dict):
-                    timestamp = int(user_details.get("Timestamp", 0))
-                    if timestamp > latest_login_timestamp:
-                        latest_login_timestamp = timestamp
-                        active_user_dir_from_login = candidate["path"]
-        except Exception as e:
-            print(
-                f"WARNING: Could not process loginusers.vdf for user {user_id_str_candidate}: {e}",
-                file=sys.stderr,
-            )
+        timestamp = login_timestamps_by_file[loginusers_path].get(
+            candidate["user_id_str"], 0
+        )
+        if timestamp > latest_login_timestamp:
+            latest_login_timestamp = timestamp
+            active_user_dir_from_login = candidate["path"]
 
     if active_user_dir_from_login:
-        print(
-            f"INFO: Active Steam user directory found via loginusers.vdf: {active_user_dir_from_login}"
+        log_info(
+            f"Active Steam user directory found via loginusers.vdf: {active_user_dir_from_login}"
         )
-        return active_user_dir_from_login
-    elif candidate_user_dirs:
-        fallback_user_dir = candidate_user_dirs[0]["path"]
-        print(
-            f"INFO: Using fallback Steam user directory (latest localconfig.vdf): {fallback_user_dir}"
+        user_dir = active_user_dir_from_login
+    else:
+        user_dir = candidate_user_dirs[0]["path"]
+        log_info(
+            f"Using fallback Steam user directory (latest localconfig.vdf): {user_dir}"
         )
-        return fallback_user_dir
-
-    return None
-
-
-def _init_crc32_tab_manual():
-    """Initializes the manual CRC32 lookup table."""
-    global _crc32_tab_manual
-    if _crc32_tab_manual:
-        return
-    _crc32_tab_manual = [0] * 256
-    for i in range(256):
-        crc = i
-        for _ in range(8):
-            crc = (crc >> 1) ^ 0xEDB88320 if crc & 1 else crc >> 1
-        _crc32_tab_manual[i] = crc
+    save_cached_userdata_path(user_dir, dependencies)
+    return user_dir
 
 
 def _calculate_crc32_for_steam_id(text_to_hash: str) -> int:
@@ -161,6 +499,53 @@ def generate_appid_for_vdf_entry(exe_path_cleaned: str, app_name_cleaned: str) -
     return int(vdf_entry_appid)
 
 
+def _gradient_strip_bytes(
+    length: int, color_start_rgb: tuple, color_end_rgb: tuple
+) -> bytes:
+    """Returns the RGB bytes of a one pixel wide gradient strip of the given length."""
+    blends = [i / float(length) for i in range(length)]
+    strip = bytearray(length * 3)
+    for channel in range(3):
+        start, end = color_start_rgb[channel], color_end_rgb[channel]
+        strip[channel::3] = bytes(
+            [int(start * (1 - blend) + end * blend) for blend in blends]
+        )
+    return bytes(strip)
+
+
+@functools.lru_cache(maxsize=GRADIENT_CACHE_SIZE)
+def _cached_gradient_canvas(
+    width: int,
+    height: int,
+    color_start_rgb: tuple,
+    color_end_rgb: tuple,
+    direction: str,
+) -> Image.Image:
+    """Renders a gradient canvas once per (size, colors, direction).
+
+    The gradient is computed for a single row or column only and stretched to
+    the full canvas with a nearest neighbour resize, which replicates the strip
+    without any per-line drawing.
+    """
+    from PIL import Image
+
+    if direction == "vertical":
+        strip = Image.frombytes(
+            "RGB",
+            (1, height),
+            _gradient_strip_bytes(height, color_start_rgb, color_end_rgb),
+        )
+    elif direction == "horizontal":
+        strip = Image.frombytes(
+            "RGB",
+            (width, 1),
+            _gradient_strip_bytes(width, color_start_rgb, color_end_rgb),
+        )
+    else:
+        return Image.new("RGB", (width, height), color_start_rgb)
+    return strip.resize((width, height), Image.Resampling.NEAREST)
+
+
 def create_gradient_image(
     width: int,
     height: int,
@@ -168,385 +553,1594 @@ def create_gradient_image(
     color_end_rgb: tuple,
     direction: str = "vertical",
 ) -> Image.Image:  # Added type hint for direction
-    """Creates an image with a linear gradient."""
-    base = Image.new("RGB", (width, height), color_start_rgb)
-    draw = ImageDraw.Draw(base)
-    if direction == "vertical":
-        for y in range(height):
-            blend = y / float(height)
-            r = int(color_start_rgb[0] * (1 - blend) + color_end_rgb[0] * blend)
-            g = int(color_start_rgb[1] * (1 - blend) + color_end_rgb[1] * blend)
-            b = int(color_start_rgb[2] * (1 - blend) + color_end_rgb[2] * blend)
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
-    elif direction == "horizontal":
-        for x in range(width):
-            blend = x / float(width)
-            r = int(color_start_rgb[0] * (1 - blend) + color_end_rgb[0] * blend)
-            g = int(color_start_rgb[1] * (1 - blend) + color_end_rgb[1] * blend)
-            b = int(color_start_rgb[2] * (1 - blend) + color_end_rgb[2] * blend)
-            draw.line([(x, 0), (x, height)], fill=(r, g, b))
-    return base
+    """Creates an image with a linear gradient.
 
+    Canvases are cached in-process, callers get their own copy to draw on.
+    """
+    return _cached_gradient_canvas(
+        width, height, tuple(color_start_rgb), tuple(color_end_rgb), direction
+    ).copy()
 
-def scale_image_to_fit_bbox(
-    image: Image.Image, bbox_width: int, bbox_height: int, resample_method
-) -> Image.Image:
-    """Scales an image (up or down) preserving aspect ratio to fit within a bounding box."""
-    original_width, original_height = image.size
+
+def fit_size_to_bbox(
+    original_size: Tuple[int, int], bbox_width: int, bbox_height: int
+) -> Tuple[int, int]:
+    """Returns the size an image gets when scaled to fit within a bounding box."""
+    original_width, original_height = original_size
     if original_width == 0 or original_height == 0:
-        return image.copy()
+        return original_size
     width_ratio = float(bbox_width) / original_width
     height_ratio = float(bbox_height) / original_height
     scale_ratio = min(width_ratio, height_ratio)
     new_width = max(1, int(original_width * scale_ratio))
     new_height = max(1, int(original_height * scale_ratio))
-    return image.resize((new_width, new_height), resample_method)
+    return new_width, new_height
 
 
-def save_steam_artwork(
-    artwork_short_appid_str: str,
-    app_logo_source_path_str: str,
-    grid_dir: Path,
-    watermark_logo_path_str: Optional[str] = None,  # mypy fix: Optional[str]
-):
-    """Saves all standard Steam artwork types with enhancements."""
-    if not PIL_AVAILABLE:
-        print(
-            "WARNING: Pillow library not available. Artwork processing skipped.",
-            file=sys.stderr,
+def scale_image_to_fit_bbox(
+    image: Image.Image, bbox_width: int, bbox_height: int, resample_method
+) -> Image.Image:
+    """Scales an image (up or down) preserving aspect ratio to fit within a bounding box."""
+    if image.width == 0 or image.height == 0:
+        return image.copy()
+    return image.resize(
+        fit_size_to_bbox(image.size, bbox_width, bbox_height), resample_method
+    )
+
+
+def app_logo_bbox(target_name: str) -> Tuple[int, int]:
+    """Returns the bounding box the app logo is scaled into for an artwork target."""
+    target_width, target_height = TARGET_SIZES[target_name]
+    if target_name == "library_header_capsule":
+        return int(target_width * 0.9), int(
+            target_height * APP_LOGO_SCALE_FACTOR_LANDSCAPE
         )
-        return False
+    if target_name == "hero":
+        return int(target_width * 0.7), int(
+            target_height * APP_LOGO_SCALE_FACTOR_LANDSCAPE
+        )
+    if target_name == "portrait":
+        return int(target_width * APP_LOGO_SCALE_FACTOR_PORTRAIT), int(
+            target_height * APP_LOGO_SCALE_FACTOR_PORTRAIT
+        )
+    if target_name == "icon_square":
+        return int(target_width * APP_LOGO_SCALE_FACTOR_ICON), int(
+            target_height * APP_LOGO_SCALE_FACTOR_ICON
+        )
+    return target_width, target_height
 
-    app_logo_source_path = Path(app_logo_source_path_str)
 
-    print(
-        f"DEBUG_ARTWORK: Received app_logo_source_path_str: '{app_logo_source_path_str}'"
-    )
-    print(f"DEBUG_ARTWORK: Path object app_logo_source_path: '{app_logo_source_path}'")
-    print(
-        f"DEBUG_ARTWORK: app_logo_source_path.exists(): {app_logo_source_path.exists()}"
-    )
-    print(
-        f"DEBUG_ARTWORK: app_logo_source_path.is_file(): {app_logo_source_path.is_file()}"
-    )
-    print(
-        f"DEBUG_ARTWORK: app_logo_source_path.is_dir(): {app_logo_source_path.is_dir()}"
-    )
+def reduce_image_by_half(image: Image.Image) -> Image.Image:
+    """Halves an image with Image.reduce(2), one horizontal stripe at a time.
 
-    if not grid_dir or not app_logo_source_path.is_file():
-        print(
-            f"ERROR: Invalid app logo source path or grid directory. AppLogo='{app_logo_source_path}', Grid='{grid_dir}'",
-            file=sys.stderr,
+    Reducing an RGBA image in one go premultiplies a full size copy first; going
+    stripe by stripe keeps the extra memory at the size of a single stripe while
+    producing exactly the same pixels.
+    """
+    from PIL import Image
+
+    reduced = Image.new(image.mode, ((image.width + 1) // 2, (image.height + 1) // 2))
+    for top in range(0, image.height, REDUCE_STRIPE_HEIGHT):
+        bottom = min(top + REDUCE_STRIPE_HEIGHT, image.height)
+        reduced.paste(
+            image.crop((0, top, image.width, bottom)).reduce(2), (0, top // 2)
         )
-        if (
-            grid_dir
-            and app_logo_source_path.exists()
-            and not app_logo_source_path.is_file()
+    return reduced
+
+
+class SourceLogo:
+    """A source logo decoded once, held as a small power-of-two pyramid.
+
+    Only the pyramid levels needed to serve the requested sizes are kept: the
+    full resolution decode is dropped as soon as a half sized level is still
+    PYRAMID_REDUCING_GAP times the largest requested size. JPEG sources are
+    decoded at a reduced scale via draft() right away. Each target is then
+    resampled from the smallest level keeping that gap, so no full resolution
+    copies are made and LANCZOS only ever works on a moderately oversized level.
+    """
+
+    def __init__(self, path: Path, bboxes: List[Tuple[int, int]]):
+        from PIL import Image
+
+        with Image.open(path) as source:
+            self.original_size = source.size
+            self.target_sizes = [
+                fit_size_to_bbox(self.original_size, bbox_w, bbox_h)
+                for bbox_w, bbox_h in bboxes
+            ]
+            largest_w = max(size[0] for size in self.target_sizes)
+            largest_h = max(size[1] for size in self.target_sizes)
+            source.draft(None, (largest_w, largest_h))
+            source.load()
+            # Reduce in the native mode where possible, so the full resolution
+            # image is never held twice (decoded and converted). A tRNS color
+            # key would not survive reduce(), so it is turned into alpha first.
+            level: Image.Image
+            if source.mode in REDUCIBLE_MODES and "transparency" not in source.info:
+                level = source
+            else:
+                level = source.convert("RGBA")
+            while level.width // 2 >= largest_w * PYRAMID_REDUCING_GAP and (
+                level.height // 2 >= largest_h * PYRAMID_REDUCING_GAP
+            ):
+                level = reduce_image_by_half(level)
+            if level.mode != "RGBA":
+                level = level.convert("RGBA")
+        self.levels = [level]
+
+        smallest_w = min(size[0] for size in self.target_sizes)
+        smallest_h = min(size[1] for size in self.target_sizes)
+        while level.width // 2 >= smallest_w * PYRAMID_REDUCING_GAP and (
+            level.height // 2 >= smallest_h * PYRAMID_REDUCING_GAP
         ):
-            print(
-                f"DEBUG_ARTWORK: The path '{app_logo_source_path}' exists but is not a file (it's a directory or other type)."
-            )
-        elif grid_dir and not app_logo_source_path.exists():
-            print(f"DEBUG_ARTWORK: The path '{app_logo_source_path}' does not exist.")
-            try:
-                parent_dir = app_logo_source_path.parent
-                print(
-                    f"DEBUG_ARTWORK: Checking parent directory '{parent_dir}'. Exists: {parent_dir.exists()}, IsDir: {parent_dir.is_dir()}"
-                )
-                if parent_dir.exists() and parent_dir.is_dir():
-                    print(f"DEBUG_ARTWORK: Contents of '{parent_dir}':")
-                    for item in parent_dir.iterdir():
-                        print(f"  - {item.name} {'(DIR)' if item.is_dir() else ''}")
-            except Exception as e_debug:
-                print(
-                    f"DEBUG_ARTWORK: Error trying to list parent directory: {e_debug}"
-                )
-        return False
+            level = level.reduce(2)
+            self.levels.append(level)
 
-    try:
-        grid_dir.mkdir(parents=True, exist_ok=True)
-    except Exception as e:
-        print(
-            f"ERROR: Could not create grid directory: {grid_dir} - {e}", file=sys.stderr
-        )
-        return False
+    def scaled_to_fit(self, bbox_width: int, bbox_height: int) -> Image.Image:
+        """Returns the logo scaled to fit within the bounding box."""
+        from PIL import Image
 
-    try:
-        app_logo_original = Image.open(app_logo_source_path).convert("RGBA")
-        watermark_logo_original = None
-        if watermark_logo_path_str and Path(watermark_logo_path_str).is_file():
-            watermark_logo_original = Image.open(watermark_logo_path_str).convert(
-                "RGBA"
-            )
-        elif watermark_logo_path_str:
-            print(
-                f"WARNING: Watermark logo not found at '{watermark_logo_path_str}', skipping watermark branding."
-            )
+        target_size = fit_size_to_bbox(self.original_size, bbox_width, bbox_height)
+        level = self.levels[0]
+        for candidate in self.levels[1:]:
+            if (
+                candidate.width < target_size[0] * PYRAMID_REDUCING_GAP
+                or candidate.height < target_size[1] * PYRAMID_REDUCING_GAP
+            ):
+                break
+            level = candidate
+        if level.size == target_size:
+            return level
+        return level.resize(target_size, Image.Resampling.LANCZOS)
 
-        base_name = artwork_short_appid_str
 
-        header_capsule_target_size = TARGET_SIZES["library_header_capsule"]
-        header_canvas = create_gradient_image(
-            header_capsule_target_size[0],
-            header_capsule_target_size[1],
-            GRADIENT_COLOR_START,
-            GRADIENT_COLOR_END,
-            direction="horizontal",
-        )
-        header_app_logo_bbox_h = int(
-            header_capsule_target_size[1] * APP_LOGO_SCALE_FACTOR_LANDSCAPE
-        )
-        header_app_logo_bbox_w = int(header_capsule_target_size[0] * 0.9)
-        app_logo_for_header = scale_image_to_fit_bbox(
-            app_logo_original.copy(),
-            header_app_logo_bbox_w,
-            header_app_logo_bbox_h,
-            Image.Resampling.LANCZOS,
-        )
-        header_logo_x = (header_capsule_target_size[0] - app_logo_for_header.width) // 2
-        header_logo_y = (
-            header_capsule_target_size[1] - app_logo_for_header.height
-        ) // 2
-        header_canvas.paste(
-            app_logo_for_header, (header_logo_x, header_logo_y), app_logo_for_header
-        )
-        if watermark_logo_original:
-            watermark_for_header = watermark_logo_original.copy()
-            watermark_header_height = int(header_capsule_target_size[1] * 0.15)
-            watermark_for_header = scale_image_to_fit_bbox(
-                watermark_for_header,
-                int(
-                    watermark_header_height
-                    * (watermark_for_header.width / float(watermark_for_header.height))
-                    if watermark_for_header.height > 0
-                    else watermark_header_height
-                ),
-                watermark_header_height,
-                Image.Resampling.LANCZOS,
-            )
-            header_canvas.paste(
-                watermark_for_header,
-                (20, header_capsule_target_size[1] - watermark_for_header.height - 20),
-                watermark_for_header,
-            )
-        header_path_png = grid_dir / f"{base_name}.png"
-        header_canvas.save(header_path_png, "PNG")
-        print(f"INFO: Enhanced Library Header Capsule saved: {header_path_png}")
-
-        hero_target_size = TARGET_SIZES["hero"]
-        hero_canvas = create_gradient_image(
-            hero_target_size[0],
-            hero_target_size[1],
-            GRADIENT_COLOR_START,
-            GRADIENT_COLOR_END,
-            direction="horizontal",
-        )
-        hero_app_logo_bbox_h = int(
-            hero_target_size[1] * APP_LOGO_SCALE_FACTOR_LANDSCAPE
-        )
-        hero_app_logo_bbox_w = int(hero_target_size[0] * 0.7)
-        app_logo_for_hero = scale_image_to_fit_bbox(
-            app_logo_original.copy(),
-            hero_app_logo_bbox_w,
-            hero_app_logo_bbox_h,
-            Image.Resampling.LANCZOS,
-        )
-        hero_logo_x = (hero_target_size[0] - app_logo_for_hero.width) // 2
-        hero_logo_y = (hero_target_size[1] - app_logo_for_hero.height) // 2
-        hero_canvas.paste(
-            app_logo_for_hero, (hero_logo_x, hero_logo_y), app_logo_for_hero
-        )
-        if watermark_logo_original:
-            watermark_for_hero = watermark_logo_original.copy()
-            watermark_hero_height = int(hero_target_size[1] * 0.1)
-            watermark_for_hero = scale_image_to_fit_bbox(
-                watermark_for_hero,
-                int(
-                    watermark_hero_height
-                    * (watermark_for_hero.width / float(watermark_for_hero.height))
-                    if watermark_for_hero.height > 0
-                    else watermark_hero_height
-                ),
-                watermark_hero_height,
-                Image.Resampling.LANCZOS,
-            )
-            hero_canvas.paste(watermark_for_hero, (30, 30), watermark_for_hero)
-        hero_path_png = grid_dir / f"{base_name}_hero.png"
-        hero_canvas.save(hero_path_png, "PNG")
-        print(f"INFO: Enhanced Hero image saved: {hero_path_png}")
-
-        portrait_target_size = TARGET_SIZES["portrait"]
-        portrait_canvas = create_gradient_image(
-            portrait_target_size[0],
-            portrait_target_size[1],
-            GRADIENT_COLOR_START,
-            GRADIENT_COLOR_END,
-            direction="vertical",
-        )
-        portrait_app_logo_bbox_w = int(
-            portrait_target_size[0] * APP_LOGO_SCALE_FACTOR_PORTRAIT
-        )
-        portrait_app_logo_bbox_h = int(
-            portrait_target_size[1] * APP_LOGO_SCALE_FACTOR_PORTRAIT
-        )
-        app_logo_for_portrait = scale_image_to_fit_bbox(
-            app_logo_original.copy(),
-            portrait_app_logo_bbox_w,
-            portrait_app_logo_bbox_h,
-            Image.Resampling.LANCZOS,
-        )
-        portrait_logo_x = (portrait_target_size[0] - app_logo_for_portrait.width) // 2
-        portrait_logo_y = (portrait_target_size[1] - app_logo_for_portrait.height) // 2
-        portrait_canvas.paste(
-            app_logo_for_portrait,
-            (portrait_logo_x, portrait_logo_y),
-            app_logo_for_portrait,
-        )
-        if watermark_logo_original:
-            watermark_for_portrait = watermark_logo_original.copy()
-            watermark_portrait_width = int(portrait_target_size[0] * 0.15)
-            watermark_for_portrait = scale_image_to_fit_bbox(
-                watermark_for_portrait,
-                watermark_portrait_width,
-                int(
-                    watermark_portrait_width
-                    * (
-                        watermark_for_portrait.height
-                        / float(watermark_for_portrait.width)
-                    )
-                    if watermark_for_portrait.width > 0
-                    else watermark_portrait_width
-                ),
-                Image.Resampling.LANCZOS,
-            )
-            portrait_canvas.paste(
-                watermark_for_portrait, (20, 20), watermark_for_portrait
-            )
-        grid_path_p_png = grid_dir / f"{base_name}p.png"
-        portrait_canvas.save(grid_path_p_png, "PNG")
-        print(f"INFO: Enhanced Portrait (p) image saved: {grid_path_p_png}")
-
-        icon_target_size = TARGET_SIZES["icon_square"]
-        icon_canvas = Image.new("RGBA", icon_target_size, (0, 0, 0, 0))
-        icon_app_logo_bbox_w = int(icon_target_size[0] * APP_LOGO_SCALE_FACTOR_ICON)
-        icon_app_logo_bbox_h = int(icon_target_size[1] * APP_LOGO_SCALE_FACTOR_ICON)
-        app_logo_for_icon = scale_image_to_fit_bbox(
-            app_logo_original.copy(),
-            icon_app_logo_bbox_w,
-            icon_app_logo_bbox_h,
-            Image.Resampling.LANCZOS,
-        )
-        icon_logo_x = (icon_target_size[0] - app_logo_for_icon.width) // 2
-        icon_logo_y = (icon_target_size[1] - app_logo_for_icon.height) // 2
-        icon_canvas.paste(
-            app_logo_for_icon, (icon_logo_x, icon_logo_y), app_logo_for_icon
-        )
-        icon_specific_png = grid_dir / f"{base_name}_icon.png"
-        icon_canvas.save(icon_specific_png, "PNG")
-        print(f"INFO: Enhanced Icon image saved: {icon_specific_png}")
+def configure_gradient(adaptive: bool):
+    """Selects fixed or adaptive (per logo) gradient colors (--gradient)."""
+    global _adaptive_gradient
+    _adaptive_gradient = adaptive
 
-        logo_target_bbox_w, logo_target_bbox_h = TARGET_SIZES["logo_steam"]
-        app_logo_for_steamlogo = scale_image_to_fit_bbox(
-            app_logo_original.copy(),
-            logo_target_bbox_w,
-            logo_target_bbox_h,
-            Image.Resampling.LANCZOS,
-        )
-        final_steam_logo = Image.new("RGBA", app_logo_for_steamlogo.size, (0, 0, 0, 0))
-        final_steam_logo.paste(app_logo_for_steamlogo, (0, 0), app_logo_for_steamlogo)
-        logo_path_png = grid_dir / f"{base_name}_logo.png"
-        final_steam_logo.save(logo_path_png, "PNG")
-        print(f"INFO: Enhanced Steam Logo image saved: {logo_path_png}")
 
-        return True
+def dominant_color(image: Image.Image) -> Optional[Tuple[int, int, int]]:
+    """Returns the most common opaque color of a logo, None if it is transparent.
 
-    except FileNotFoundError:
-        print(
-            f"ERROR: App logo source file not found: {app_logo_source_path}",
-            file=sys.stderr,
-        )
-        return False
-    except Exception as e:
-        print(
-            f"ERROR: Artwork processing failed for {app_logo_source_path}: {e}",
-            file=sys.stderr,
-        )
-        import traceback
+    Works on a GRADIENT_SAMPLE_SIZE thumbnail (nearest neighbour samples, enough
+    to find a dominant color) reduced to GRADIENT_SAMPLE_COLORS colors, so it
+    only takes a few milliseconds whatever the logo size.
+    """
+    from PIL import Image
 
-        traceback.print_exc()
-        return False
+    thumbnail = image.resize(
+        fit_size_to_bbox(image.size, GRADIENT_SAMPLE_SIZE, GRADIENT_SAMPLE_SIZE),
+        Image.Resampling.NEAREST,
+    )
+    opaque_mask = thumbnail.getchannel("A").point(lambda a: 255 if a >= 128 else 0)
+    quantized = thumbnail.convert("RGB").quantize(
+        GRADIENT_SAMPLE_COLORS, method=Image.Quantize.FASTOCTREE
+    )
+    counts = quantized.histogram(opaque_mask)
+    palette = quantized.getpalette() or []
+    most_common = max(range(len(counts)), key=counts.__getitem__)
+    if not counts[most_common]:
+        return None
+    red, green, blue = palette[most_common * 3 : most_common * 3 + 3]
+    return red, green, blue
 
 
-def add_shortcut(
-    userdata_path: Path,
-    flatpak_appid_tag: str,
-    app_name_param: str,
-    exe_param: str,
-    launch_options_param: str,
-    icon_source_param: str,
-    watermark_logo_param: Optional[str] = None,  # mypy fix: Optional[str]
-):
-    """Adds a shortcut to Steam."""
-    shortcuts_path = userdata_path / "config/shortcuts.vdf"
-    grid_path = userdata_path / "config/grid"
+def adaptive_gradient_colors(color: Optional[Tuple[int, int, int]]) -> List[list]:
+    """Derives dark gradient start and end colors keeping the hue of 'color'."""
+    if not color or max(color) == 0:
+        return [list(GRADIENT_COLOR_START), list(GRADIENT_COLOR_END)]
+    return [
+        [round(channel * brightness / max(color)) for channel in color]
+        for brightness in GRADIENT_ADAPTIVE_BRIGHTNESS
+    ]
 
-    shortcuts = {}
-    original_vdf_data_structure = {}
-    try:
-        if shortcuts_path.is_file():
-            with open(shortcuts_path, "rb") as f:
-                original_vdf_data_structure = vdf.binary_load(f)
-                shortcuts = original_vdf_data_structure.get(
-                    "shortcuts", original_vdf_data_structure
-                )
-            if not isinstance(shortcuts, dict):
-                shortcuts = {}
-        else:
-            print(f"INFO: {shortcuts_path} does not exist, creating new.")
-            shortcuts_path.parent.mkdir(parents=True, exist_ok=True)
-            shortcuts = {}
-            original_vdf_data_structure = {"shortcuts": shortcuts}
 
-    except Exception as e:
-        print(f"ERROR: Failed reading {shortcuts_path}: {e}", file=sys.stderr)
-        shortcuts = {}
-        original_vdf_data_structure = {"shortcuts": shortcuts}
+def gradient_colors_cache_path() -> Path:
+    """Returns the file memoizing adaptive gradient colors per icon content."""
+    return ssm_cache_dir() / GRADIENT_COLORS_CACHE_NAME
 
-    next_id = 0
-    numeric_keys = sorted([int(k) for k in shortcuts.keys() if k.isdigit()])
-    if numeric_keys:
-        next_id = numeric_keys[-1] + 1
-    shortcut_key_str = str(next_id)
 
-    tag_to_find = f"{TAG_PREFIX}_{flatpak_appid_tag}"
-    for key, entry_dict in shortcuts.items():
-        if (
-            isinstance(entry_dict, dict)
-            and tag_to_find in entry_dict.get("tags", {}).values()
+def gradient_colors_for_logo(
+    app_logo_source_path: Path, source_logo: SourceLogo
+) -> Tuple[tuple, tuple]:
+    """Returns the gradient colors for a logo.
+
+    Without --gradient adaptive these are the fixed colors. Otherwise they are
+    derived from the logo's dominant color and memoized by the hash of the
+    icon file, so a logo is only analysed once.
+    """
+    if not _adaptive_gradient:
+        return GRADIENT_COLOR_START, GRADIENT_COLOR_END
+    digest = hashlib.sha256()
+    _hash_file_into(digest, app_logo_source_path)
+    icon_hash = digest.hexdigest()
+    cache_path = gradient_colors_cache_path()
+    colors = _load_gradient_colors_cache(cache_path)["colors"].get(icon_hash)
+    if colors is None:
+        with span("artwork.gradient"):
+            colors = adaptive_gradient_colors(dominant_color(source_logo.levels[-1]))
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            lock_path = cache_path.with_name(cache_path.name + ".lock")
+            with open(lock_path, "w") as lock:
+                # Re-read under the lock, so parallel runs keep each other's entries.
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                cache = _load_gradient_colors_cache(cache_path)
+                cache["colors"].pop(icon_hash, None)
+                cache["colors"][icon_hash] = colors
+                for stale_hash in list(cache["colors"])[:-GRADIENT_COLORS_CACHE_SIZE]:
+                    del cache["colors"][stale_hash]
+                temp_path = cache_path.with_name(
+                    f".{cache_path.name}.{os.getpid()}.tmp"
+                )
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(cache, f)
+                os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"WARNING: Could not cache gradient colors: {e}", file=sys.stderr)
+    return tuple(colors[0]), tuple(colors[1])
+
+
+def _load_gradient_colors_cache(cache_path: Path) -> dict:
+    """Reads the gradient colors cache, an empty one if missing or outdated."""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == GRADIENT_COLORS_CACHE_VERSION and isinstance(
+            cache.get("colors"), dict
         ):
-            print(
-                f"WARNING: Shortcut for AppID Tag '{flatpak_appid_tag}' (Tag: '{tag_to_find}') seems to already exist (Index: {key}). Skipping add."
-            )
-            return True
+            return cache
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {"version": GRADIENT_COLORS_CACHE_VERSION, "colors": {}}
 
-    clean_exe_for_id_gen = exe_param.strip('"')
-    clean_name_for_id_gen = app_name_param.strip('"')
 
-    artwork_short_id_str = generate_short_appid_for_artwork(
-        clean_exe_for_id_gen, clean_name_for_id_gen
+def scale_watermark_for_target(
+    watermark_logo: Image.Image, target_name: str
+) -> Image.Image:
+    """Scales the watermark for the header, hero or portrait artwork."""
+    from PIL import Image
+
+    target_width, target_height = TARGET_SIZES[target_name]
+    if target_name == "portrait":
+        watermark_width = int(target_width * 0.15)
+        return scale_image_to_fit_bbox(
+            watermark_logo,
+            watermark_width,
+            int(
+                watermark_width * (watermark_logo.height / float(watermark_logo.width))
+                if watermark_logo.width > 0
+                else watermark_width
+            ),
+            Image.Resampling.LANCZOS,
+        )
+    watermark_height = int(
+        target_height * (0.15 if target_name == "library_header_capsule" else 0.1)
     )
-    print(f"INFO: Generated Short AppID for Artwork: {artwork_short_id_str}")
-    vdf_entry_appid_int = generate_appid_for_vdf_entry(
-        clean_exe_for_id_gen, clean_name_for_id_gen
+    return scale_image_to_fit_bbox(
+        watermark_logo,
+        int(
+            watermark_height * (watermark_logo.width / float(watermark_logo.height))
+            if watermark_logo.height > 0
+            else watermark_height
+        ),
+        watermark_height,
+        Image.Resampling.LANCZOS,
     )
-    print(f"INFO: Generated 'appid' for VDF entry: {vdf_entry_appid_int}")
 
-    icon_path_in_vdf = ""
-    if icon_source_param:
-        icon_path_in_vdf = str(grid_path / f"{artwork_short_id_str}_icon.png")
 
-    shortcut_entry = {
-        "appid": vdf_entry_appid_int,
+def render_artwork_target(
+    target_name: str,
+    source_logo: SourceLogo,
+    watermark: Optional[Image.Image] = None,
+    gradient_colors: Tuple[tuple, tuple] = (GRADIENT_COLOR_START, GRADIENT_COLOR_END),
+) -> Image.Image:
+    """Renders the canvas of a single artwork target.
+
+    'watermark' is already scaled for the target (see scaled_watermark).
+    """
+    from PIL import Image
+
+    target_size = TARGET_SIZES[target_name]
+    with span("artwork.resize", target=target_name):
+        app_logo = source_logo.scaled_to_fit(*app_logo_bbox(target_name))
+
+    with span("artwork.composite", target=target_name):
+        if target_name == "logo_steam":
+            final_steam_logo = Image.new("RGBA", app_logo.size, (0, 0, 0, 0))
+            final_steam_logo.paste(app_logo, (0, 0), app_logo)
+            return final_steam_logo
+
+        if target_name == "icon_square":
+            canvas = Image.new("RGBA", target_size, (0, 0, 0, 0))
+        else:
+            canvas = create_gradient_image(
+                target_size[0],
+                target_size[1],
+                gradient_colors[0],
+                gradient_colors[1],
+                direction="vertical" if target_name == "portrait" else "horizontal",
+            )
+        logo_x = (target_size[0] - app_logo.width) // 2
+        logo_y = (target_size[1] - app_logo.height) // 2
+        canvas.paste(app_logo, (logo_x, logo_y), app_logo)
+
+        if watermark:
+            if target_name == "library_header_capsule":
+                watermark_position = (20, target_size[1] - watermark.height - 20)
+            elif target_name == "hero":
+                watermark_position = (30, 30)
+            else:
+                watermark_position = (20, 20)
+            canvas.paste(watermark, watermark_position, watermark)
+        return canvas
+
+
+def peak_rss_mib() -> float:
+    """Returns the peak resident set size of this process in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+@functools.lru_cache(maxsize=4)
+def _decode_watermark_logo(path_str: str, stamp: Tuple[int, ...]) -> Image.Image:
+    """Decodes a watermark logo once per file identity (see scaled_watermark)."""
+    from PIL import Image
+
+    with Image.open(path_str) as watermark_logo:
+        return watermark_logo.convert("RGBA")
+
+
+def watermark_cache_dir(grid_dir: Path) -> Path:
+    """Returns the directory of the pre-scaled watermarks, next to the grid directory."""
+    return grid_dir.parent / WATERMARK_CACHE_DIR_NAME
+
+
+@functools.lru_cache(maxsize=WATERMARK_CACHE_SIZE)
+def _scaled_watermark(
+    path_str: str,
+    stamp: Tuple[int, ...],
+    target_name: str,
+    target_size: Tuple[int, int],
+    cache_dir_str: str,
+) -> Image.Image:
+    """Returns a watermark scaled for a target, see scaled_watermark."""
+    from PIL import Image
+
+    cache_name = hashlib.sha256(
+        json.dumps([path_str, stamp, target_name, target_size]).encode("utf-8")
+    ).hexdigest()
+    cached_path = Path(cache_dir_str) / f"{cache_name[:32]}.png"
+    try:
+        with Image.open(cached_path) as cached_watermark:
+            return cached_watermark.convert("RGBA")
+    except (OSError, ValueError):
+        pass
+
+    watermark = scale_watermark_for_target(
+        _decode_watermark_logo(path_str, stamp), target_name
+    )
+    try:
+        cached_path.parent.mkdir(exist_ok=True)
+        temp_path = cached_path.with_suffix(f".{os.getpid()}.tmp")
+        watermark.save(temp_path, "PNG", compress_level=1)
+        os.replace(temp_path, cached_path)
+        _prune_watermark_cache(cached_path.parent)
+    except OSError as e:
+        print(f"WARNING: Could not cache the scaled watermark: {e}", file=sys.stderr)
+    return watermark
+
+
+def _prune_watermark_cache(cache_dir: Path):
+    """Deletes all but the WATERMARK_CACHE_SIZE most recently written variants."""
+    cached_files = []
+    for cached_path in cache_dir.glob("*.png"):
+        try:
+            cached_files.append((cached_path.stat().st_mtime, cached_path))
+        except FileNotFoundError:
+            continue
+    cached_files.sort(reverse=True)
+    for _, stale_path in cached_files[WATERMARK_CACHE_SIZE:]:
+        stale_path.unlink(missing_ok=True)
+
+
+def scaled_watermark(
+    watermark_logo_path: Path, target_name: str, grid_dir: Path
+) -> Image.Image:
+    """Returns the watermark scaled for the header, hero or portrait artwork.
+
+    The variants are kept in memory and as PNG files next to the grid directory,
+    keyed by the identity of the watermark file and the target geometry, so the
+    watermark is decoded and scaled once and not again for every app or run.
+    Callers must not modify the returned image.
+    """
+    return _scaled_watermark(
+        str(watermark_logo_path),
+        tuple(file_stamp(watermark_logo_path)),
+        target_name,
+        TARGET_SIZES[target_name],
+        str(watermark_cache_dir(grid_dir)),
+    )
+
+
+def artwork_render_parameters() -> dict:
+    """Returns every setting that influences the rendered artwork pixels."""
+    return {
+        "version": ARTWORK_CACHE_VERSION,
+        "target_sizes": TARGET_SIZES,
+        "filename_suffixes": ARTWORK_FILENAME_SUFFIXES,
+        "gradient": (
+            ["adaptive", GRADIENT_SAMPLE_SIZE, GRADIENT_ADAPTIVE_BRIGHTNESS]
+            if _adaptive_gradient
+            else [GRADIENT_COLOR_START, GRADIENT_COLOR_END]
+        ),
+        "logo_scale_factors": [
+            APP_LOGO_SCALE_FACTOR_LANDSCAPE,
+            APP_LOGO_SCALE_FACTOR_PORTRAIT,
+            APP_LOGO_SCALE_FACTOR_ICON,
+        ],
+        "pyramid_reducing_gap": PYRAMID_REDUCING_GAP,
+        "encoding": artwork_encoding(),
+    }
+
+
+def _hash_file_into(digest, path: Path):
+    """Feeds the contents of a file into a hashlib digest."""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+
+def artwork_cache_key(
+    app_logo_source_path: Path, watermark_logo_path: Optional[Path]
+) -> str:
+    """Returns the content hash of all inputs of an artwork render."""
+    digest = hashlib.sha256()
+    _hash_file_into(digest, app_logo_source_path)
+    digest.update(b"\0watermark\0")
+    if watermark_logo_path:
+        _hash_file_into(digest, watermark_logo_path)
+    digest.update(b"\0parameters\0")
+    digest.update(
+        json.dumps(artwork_render_parameters(), sort_keys=True).encode("utf-8")
+    )
+    return digest.hexdigest()
+
+
+def artwork_cache_manifest_path(grid_dir: Path) -> Path:
+    """Returns the sidecar manifest of the artwork cache, next to the grid directory."""
+    return grid_dir.parent / ARTWORK_CACHE_MANIFEST_NAME
+
+
+def load_artwork_cache(grid_dir: Path) -> dict:
+    """Loads the artwork cache manifest, an unreadable manifest counts as empty."""
+    try:
+        with open(artwork_cache_manifest_path(grid_dir), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict) and isinstance(manifest.get("entries"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"entries": {}}
+
+
+@contextlib.contextmanager
+def locked_artwork_cache(grid_dir: Path) -> Iterator[dict]:
+    """Yields the artwork cache manifest for modification.
+
+    The manifest is re-read under an exclusive lock and replaced atomically
+    afterwards, so parallel render workers do not lose each other's entries.
+    """
+    manifest_path = artwork_cache_manifest_path(grid_dir)
+    with open(manifest_path.with_name(manifest_path.name + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        manifest = load_artwork_cache(grid_dir)
+        yield manifest
+        temp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(temp_path, manifest_path)
+
+
+def record_artwork_cache_entry(
+    grid_dir: Path, artwork_short_appid_str: str, cache_key: str, filenames: List[str]
+):
+    """Records rendered artwork in the cache manifest."""
+    with locked_artwork_cache(grid_dir) as manifest:
+        manifest["entries"][artwork_short_appid_str] = {
+            "key": cache_key,
+            "files": filenames,
+        }
+
+
+def configure_artwork_encoding(
+    profile: str = "default",
+    formats: Optional[dict] = None,
+    png_compress_level: Optional[int] = None,
+    optimize: Optional[bool] = None,
+    jpeg_quality: Optional[int] = None,
+):
+    """Selects the encoder settings of all following artwork renders.
+
+    Starts from a named profile of ARTWORK_ENCODER_PROFILES; 'formats' maps
+    target names to a key of ARTWORK_FORMATS. Raises ValueError for unknown
+    targets or formats and for JPEG on a target that needs transparency.
+    """
+    settings = ARTWORK_ENCODER_PROFILES[profile]
+    target_formats = {target_name: "png" for target_name in TARGET_SIZES}
+    target_formats.update(settings["formats"])
+    for target_name, format_name in (formats or {}).items():
+        if target_name not in TARGET_SIZES:
+            raise ValueError(f"unknown artwork target '{target_name}'")
+        if format_name not in ARTWORK_FORMATS:
+            raise ValueError(f"unsupported artwork format '{format_name}'")
+        if target_name in TRANSPARENT_TARGETS and format_name != "png":
+            raise ValueError(f"'{target_name}' needs transparency, use png")
+        target_formats[target_name] = format_name
+    _artwork_encoding.clear()
+    _artwork_encoding.update(
+        {
+            "formats": target_formats,
+            "png_compress_level": (
+                settings["png_compress_level"]
+                if png_compress_level is None
+                else png_compress_level
+            ),
+            "optimize": (settings["optimize"] if optimize is None else optimize),
+            "jpeg_quality": (
+                settings["jpeg_quality"] if jpeg_quality is None else jpeg_quality
+            ),
+        }
+    )
+
+
+def configure_render_threads(threads: Optional[int]):
+    """Sets the number of threads rendering the targets of one app (--render-threads).
+
+    None or 0 uses one thread per CPU core, up to one per artwork target.
+    """
+    global _render_threads
+    _render_threads = threads or None
+
+
+def artwork_render_threads() -> int:
+    """Returns the number of threads rendering the targets of one app."""
+    return min(_render_threads or os.cpu_count() or 1, len(TARGET_SIZES))
+
+
+def artwork_encoding() -> dict:
+    """Returns the active encoder settings, the 'default' profile unless configured."""
+    if not _artwork_encoding:
+        configure_artwork_encoding()
+    return _artwork_encoding
+
+
+def render_settings() -> dict:
+    """Returns the active encoder, gradient and render thread configuration.
+
+    The result is JSON serializable and is activated again, e.g. in another
+    process, with restore_render_settings().
+    """
+    return {
+        "encoding": json.loads(json.dumps(artwork_encoding())),
+        "adaptive_gradient": _adaptive_gradient,
+        "render_threads": _render_threads,
+    }
+
+
+def same_render_output(settings: dict, other_settings: dict) -> bool:
+    """Tells whether two render_settings() produce identical artwork files."""
+    return all(
+        settings.get(name) == other_settings.get(name)
+        for name in ("encoding", "adaptive_gradient")
+    )
+
+
+def restore_render_settings(settings: dict):
+    """Activates a configuration returned by render_settings()."""
+    _artwork_encoding.clear()
+    _artwork_encoding.update(settings["encoding"])
+    configure_gradient(settings["adaptive_gradient"])
+    configure_render_threads(settings["render_threads"])
+
+
+def artwork_filename(artwork_short_appid_str: str, target_name: str) -> str:
+    """Returns the grid filename of one artwork target in its configured format."""
+    extension = ARTWORK_FORMATS[artwork_encoding()["formats"][target_name]][1]
+    return (
+        f"{artwork_short_appid_str}{ARTWORK_FILENAME_SUFFIXES[target_name]}{extension}"
+    )
+
+
+def forget_artwork_cache_entries(grid_dir: Path, artwork_short_appids: set):
+    """Removes the cache entries of apps whose artwork was deleted."""
+    if not artwork_short_appids.intersection(load_artwork_cache(grid_dir)["entries"]):
+        return
+    with locked_artwork_cache(grid_dir) as manifest:
+        for artwork_short_appid_str in artwork_short_appids:
+            manifest["entries"].pop(artwork_short_appid_str, None)
+
+
+def artwork_filenames(artwork_short_appid_str: str) -> List[str]:
+    """Returns the grid filenames of all artwork targets of an app."""
+    return [
+        artwork_filename(artwork_short_appid_str, target_name)
+        for target_name in TARGET_SIZES
+    ]
+
+
+def encode_artwork(canvas: Image.Image, target_path: Path, target_name: str):
+    """Saves a rendered artwork target with the configured encoder settings."""
+    encoding = artwork_encoding()
+    if encoding["formats"][target_name] == "jpeg":
+        canvas.convert("RGB").save(
+            target_path,
+            "JPEG",
+            quality=encoding["jpeg_quality"],
+            optimize=encoding["optimize"],
+        )
+    else:
+        canvas.save(
+            target_path,
+            "PNG",
+            compress_level=encoding["png_compress_level"],
+            optimize=encoding["optimize"],
+        )
+
+
+def artwork_is_current(
+    entries: dict, artwork_short_appid_str: str, grid_dir: Path, cache_key: str
+) -> bool:
+    """Tells whether an app's artwork on disk was rendered from the same inputs."""
+    own_entry = entries.get(artwork_short_appid_str)
+    wanted_files = artwork_filenames(artwork_short_appid_str)
+    return bool(
+        own_entry
+        and own_entry.get("key") == cache_key
+        and own_entry.get("files") == wanted_files
+        and all((grid_dir / filename).is_file() for filename in wanted_files)
+    )
+
+
+def _link_or_copy(source_path: Path, target_path: Path):
+    """Replaces target_path with a hard link to source_path, or a copy of it."""
+    target_path.unlink(missing_ok=True)
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copy2(source_path, target_path)
+
+
+def reuse_cached_artwork(
+    artwork_short_appid_str: str, grid_dir: Path, cache_key: str
+) -> bool:
+    """Reuses previously rendered artwork with the same cache key, if present.
+
+    Returns True when the app's artwork is already up to date, or when the
+    outputs of another app rendered from identical inputs could be hard-linked
+    (or copied, across filesystems) to this app's filenames.
+    """
+    entries = load_artwork_cache(grid_dir)["entries"]
+    wanted_files = artwork_filenames(artwork_short_appid_str)
+
+    if artwork_is_current(entries, artwork_short_appid_str, grid_dir, cache_key):
+        log_info(
+            f"Artwork for Short AppID {artwork_short_appid_str} is up to date, skipping rendering."
+        )
+        return True
+
+    for other_short_appid, other_entry in entries.items():
+        if other_short_appid == artwork_short_appid_str:
+            continue
+        if other_entry.get("key") != cache_key:
+            continue
+        other_files = artwork_filenames(other_short_appid)
+        if other_entry.get("files") != other_files or not all(
+            (grid_dir / filename).is_file() for filename in other_files
+        ):
+            continue
+        for source_name, target_name in zip(other_files, wanted_files):
+            _link_or_copy(grid_dir / source_name, grid_dir / target_name)
+        record_artwork_cache_entry(
+            grid_dir, artwork_short_appid_str, cache_key, wanted_files
+        )
+        log_info(
+            f"Artwork for Short AppID {artwork_short_appid_str} reused from identical render of {other_short_appid}."
+        )
+        return True
+    return False
+
+
+def place_artwork_in_grid(
+    artwork_short_appid_str: str, source_grid_dir: Path, target_grid_dir: Path
+) -> bool:
+    """Hard-links (or copies) an app's artwork rendered into one grid directory
+    into another one, e.g. of another Steam account, and records it there."""
+    source_entry = (
+        load_artwork_cache(source_grid_dir)["entries"].get(artwork_short_appid_str)
+        or {}
+    )
+    filenames = artwork_filenames(artwork_short_appid_str)
+    if source_entry.get("files") != filenames:
+        return False
+    try:
+        target_grid_dir.mkdir(parents=True, exist_ok=True)
+        if reuse_cached_artwork(
+            artwork_short_appid_str, target_grid_dir, source_entry["key"]
+        ):
+            return True
+        for filename in filenames:
+            _link_or_copy(source_grid_dir / filename, target_grid_dir / filename)
+        record_artwork_cache_entry(
+            target_grid_dir, artwork_short_appid_str, source_entry["key"], filenames
+        )
+    except OSError as e:
+        print(
+            f"ERROR: Could not place artwork in {target_grid_dir}: {e}",
+            file=sys.stderr,
+        )
+        return False
+    log_info(
+        f"Artwork for Short AppID {artwork_short_appid_str} placed in {target_grid_dir}."
+    )
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def pil_available() -> bool:
+    """Returns whether Pillow can be imported, without importing it."""
+    import importlib.util
+
+    return importlib.util.find_spec("PIL") is not None
+
+
+def _debug_missing_artwork_source(app_logo_source_path: Path):
+    """Explains with DEBUG output why an app logo source path is unusable."""
+    if app_logo_source_path.exists():
+        print(
+            f"DEBUG_ARTWORK: The path '{app_logo_source_path}' exists but is not a file (it's a directory or other type)."
+        )
+        return
+    print(f"DEBUG_ARTWORK: The path '{app_logo_source_path}' does not exist.")
+    try:
+        parent_dir = app_logo_source_path.parent
+        print(
+            f"DEBUG_ARTWORK: Checking parent directory '{parent_dir}'. Exists: {parent_dir.exists()}, IsDir: {parent_dir.is_dir()}"
+        )
+        if parent_dir.exists() and parent_dir.is_dir():
+            print(f"DEBUG_ARTWORK: Contents of '{parent_dir}':")
+            for item in parent_dir.iterdir():
+                print(f"  - {item.name} {'(DIR)' if item.is_dir() else ''}")
+    except Exception as e_debug:
+        print(f"DEBUG_ARTWORK: Error trying to list parent directory: {e_debug}")
+
+
+def _render_and_save_target(
+    target_job: Tuple[
+        str, SourceLogo, Optional[Image.Image], Tuple[tuple, tuple], Path
+    ],
+) -> Tuple[int, float]:
+    """Renders and saves one artwork target, returns (file size, encode ms)."""
+    target_name, source_logo, watermark, gradient_colors, target_path = target_job
+    canvas = render_artwork_target(target_name, source_logo, watermark, gradient_colors)
+    # Drop the previous file in any format; this also never writes through a
+    # hard link shared with another app's artwork.
+    for _, extension in ARTWORK_FORMATS.values():
+        target_path.with_suffix(extension).unlink(missing_ok=True)
+    encode_started = time.perf_counter()
+    with span("artwork.encode", target=target_name):
+        encode_artwork(canvas, target_path, target_name)
+    encode_ms = (time.perf_counter() - encode_started) * 1000
+    return target_path.stat().st_size, encode_ms
+
+
+def save_steam_artwork(
+    artwork_short_appid_str: str,
+    app_logo_source_path_str: str,
+    grid_dir: Path,
+    watermark_logo_path_str: Optional[str] = None,  # mypy fix: Optional[str]
+):
+    """Saves all standard Steam artwork types with enhancements."""
+    if not pil_available():
+        print(
+            "WARNING: Pillow library not available. Artwork processing skipped.",
+            file=sys.stderr,
+        )
+        return False
+
+    app_logo_source_path = Path(app_logo_source_path_str)
+
+    if debug_output():
+        print(
+            f"DEBUG_ARTWORK: Received app_logo_source_path_str: '{app_logo_source_path_str}'"
+        )
+        print(
+            f"DEBUG_ARTWORK: Path object app_logo_source_path: '{app_logo_source_path}'"
+        )
+        print(
+            f"DEBUG_ARTWORK: app_logo_source_path.exists(): {app_logo_source_path.exists()}"
+        )
+        print(
+            f"DEBUG_ARTWORK: app_logo_source_path.is_file(): {app_logo_source_path.is_file()}"
+        )
+        print(
+            f"DEBUG_ARTWORK: app_logo_source_path.is_dir(): {app_logo_source_path.is_dir()}"
+        )
+
+    if not grid_dir or not app_logo_source_path.is_file():
+        print(
+            f"ERROR: Invalid app logo source path or grid directory. AppLogo='{app_logo_source_path}', Grid='{grid_dir}'",
+            file=sys.stderr,
+        )
+        if debug_output() and grid_dir:
+            _debug_missing_artwork_source(app_logo_source_path)
+        return False
+
+    try:
+        grid_dir.mkdir(parents=True, exist_ok=True)
+    except Exception as e:
+        print(
+            f"ERROR: Could not create grid directory: {grid_dir} - {e}", file=sys.stderr
+        )
+        return False
+
+    watermark_logo_path: Optional[Path] = None
+    if watermark_logo_path_str and Path(watermark_logo_path_str).is_file():
+        watermark_logo_path = Path(watermark_logo_path_str)
+    elif watermark_logo_path_str:
+        print(
+            f"WARNING: Watermark logo not found at '{watermark_logo_path_str}', skipping watermark branding."
+        )
+
+    try:
+        cache_key = artwork_cache_key(app_logo_source_path, watermark_logo_path)
+        if reuse_cached_artwork(artwork_short_appid_str, grid_dir, cache_key):
+            return True
+
+        with span("artwork.decode", source=str(app_logo_source_path)):
+            source_logo = SourceLogo(
+                app_logo_source_path,
+                [app_logo_bbox(target_name) for target_name in TARGET_SIZES],
+            )
+        gradient_colors = gradient_colors_for_logo(app_logo_source_path, source_logo)
+
+        target_jobs = []
+        for target_name, filename in zip(
+            TARGET_SIZES, artwork_filenames(artwork_short_appid_str)
+        ):
+            watermark = None
+            if watermark_logo_path and target_name in WATERMARKED_TARGETS:
+                with span("artwork.watermark", target=target_name):
+                    watermark = scaled_watermark(
+                        watermark_logo_path, target_name, grid_dir
+                    )
+            target_jobs.append(
+                (
+                    target_name,
+                    source_logo,
+                    watermark,
+                    gradient_colors,
+                    grid_dir / filename,
+                )
+            )
+
+        # The targets are independent; Pillow's resampling and zlib release the
+        # GIL, so threads render, encode and write them in parallel.
+        render_threads = artwork_render_threads()
+        if render_threads > 1:
+            import concurrent.futures
+
+            with concurrent.futures.ThreadPoolExecutor(render_threads) as executor:
+                outcomes = list(executor.map(_render_and_save_target, target_jobs))
+        else:
+            outcomes = [_render_and_save_target(job) for job in target_jobs]
+        for (target_name, *_, target_path), (file_size, encode_ms) in zip(
+            target_jobs, outcomes
+        ):
+            log_info(
+                f"Enhanced {ARTWORK_TARGET_LABELS[target_name]} saved: {target_path} "
+                f"({file_size} bytes, encoded in {encode_ms:.1f} ms)"
+            )
+
+        record_artwork_cache_entry(
+            grid_dir,
+            artwork_short_appid_str,
+            cache_key,
+            artwork_filenames(artwork_short_appid_str),
+        )
+        log_info(
+            f"Artwork rendered from {source_logo.original_size[0]}x{source_logo.original_size[1]} source "
+            f"using {len(source_logo.levels)} pyramid level(s), peak RSS: {peak_rss_mib():.1f} MiB"
+        )
+        return True
+
+    except FileNotFoundError:
+        print(
+            f"ERROR: App logo source file not found: {app_logo_source_path}",
+            file=sys.stderr,
+        )
+        return False
+    except Exception as e:
+        print(
+            f"ERROR: Artwork processing failed for {app_logo_source_path}: {e}",
+            file=sys.stderr,
+        )
+        import traceback
+
+        traceback.print_exc()
+        return False
+
+
+def _render_artwork_job(job: ArtworkJob) -> bool:
+    """Renders the artwork of one app."""
+    artwork_short_appid_str, app_logo_source_path_str, grid_dir_str, watermark = job
+    return save_steam_artwork(
+        artwork_short_appid_str, app_logo_source_path_str, Path(grid_dir_str), watermark
+    )
+
+
+def _render_artwork_job_in_worker(job: ArtworkJob) -> Tuple[bool, List[dict]]:
+    """Renders the artwork of one app inside a render worker process.
+
+    Returns the success flag and the spans the worker recorded for the job, so
+    they end up in the trace of the parent process.
+    """
+    if _trace_events is not None:
+        _trace_events.clear()
+    return _render_artwork_job(job), list(_trace_events or [])
+
+
+def _init_render_worker(settings: dict, tracing: bool, log_level: int):
+    """Configures a render worker like its parent process.
+
+    Nothing is taken over from the parent implicitly, so workers behave the
+    same under the fork, forkserver and spawn start methods.
+    """
+    global LOG_LEVEL
+    restore_render_settings(settings)
+    LOG_LEVEL = log_level
+    if tracing:
+        enable_tracing()
+
+
+def render_artwork_batch(artwork_jobs: List[ArtworkJob], jobs: int = 1) -> List[bool]:
+    """Renders the artwork of many apps and returns one success flag per job.
+
+    With more than one job the apps are spread over a process pool. Every app is
+    isolated: an exception or a crashed worker only fails the affected apps.
+    'jobs' <= 0 uses all available CPU cores.
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(artwork_jobs))
+    results = [False] * len(artwork_jobs)
+
+    if jobs <= 1:
+        for index, job in enumerate(artwork_jobs):
+            try:
+                results[index] = _render_artwork_job(job)
+            except Exception as e:
+                print(
+                    f"ERROR: Artwork rendering failed for Short AppID {job[0]}: {e}",
+                    file=sys.stderr,
+                )
+        return results
+
+    log_info(f"Rendering artwork for {len(artwork_jobs)} apps with {jobs} workers.")
+    # The workers share the cores, instead of each starting a thread per core.
+    worker_render_threads = _render_threads or max(1, (os.cpu_count() or 1) // jobs)
+    unfinished = _render_artwork_jobs_in_pool(
+        artwork_jobs, range(len(artwork_jobs)), jobs, worker_render_threads, results
+    )
+    if unfinished:
+        # A crashed worker fails every pending job of the pool. Running the
+        # unfinished jobs in a process of their own finds the one responsible.
+        print(
+            f"WARNING: A render worker crashed, retrying {len(unfinished)} app(s) in separate processes.",
+            file=sys.stderr,
+        )
+        for index in unfinished:
+            if _render_artwork_jobs_in_pool(
+                artwork_jobs, [index], 1, worker_render_threads, results
+            ):
+                print(
+                    f"ERROR: Artwork rendering failed for Short AppID {artwork_jobs[index][0]}: the render worker crashed.",
+                    file=sys.stderr,
+                )
+    return results
+
+
+def _render_artwork_jobs_in_pool(
+    artwork_jobs: List[ArtworkJob],
+    indexes: Iterable[int],
+    workers: int,
+    worker_render_threads: int,
+    results: List[bool],
+) -> List[int]:
+    """Renders the jobs at 'indexes' on a new process pool, filling 'results'.
+
+    Returns the indexes of the jobs left unfinished because a worker died
+    (e.g. segfault or OOM kill), which breaks the whole pool.
+    """
+    import concurrent.futures
+    from concurrent.futures.process import BrokenProcessPool
+
+    unfinished = []
+    worker_settings = dict(render_settings(), render_threads=worker_render_threads)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_render_worker,
+        initargs=(worker_settings, _trace_events is not None, LOG_LEVEL),
+    ) as executor:
+        future_to_index = {}
+        for index in indexes:
+            try:
+                future = executor.submit(
+                    _render_artwork_job_in_worker, artwork_jobs[index]
+                )
+            except BrokenProcessPool:
+                unfinished.append(index)
+                continue
+            future_to_index[future] = index
+        for future in concurrent.futures.as_completed(future_to_index):
+            index = future_to_index[future]
+            try:
+                results[index], worker_trace_events = future.result()
+            except BrokenProcessPool:
+                unfinished.append(index)
+                continue
+            except Exception as e:
+                print(
+                    f"ERROR: Artwork rendering failed for Short AppID {artwork_jobs[index][0]}: {e}",
+                    file=sys.stderr,
+                )
+                continue
+            if _trace_events is not None:
+                _trace_events.extend(worker_trace_events)
+    return sorted(unfinished)
+
+
+class VdfUInt64(int):
+    """An integer stored as unsigned 64 bit value in binary VDF."""
+
+
+class VdfInt64(int):
+    """An integer stored as signed 64 bit value in binary VDF."""
+
+
+class VdfPointer(int):
+    """An integer stored with the binary VDF pointer type."""
+
+
+class VdfColor(int):
+    """An integer stored with the binary VDF color type."""
+
+
+BIN_INT_WRAPPERS = {0x04: VdfPointer, 0x06: VdfColor, 0x07: VdfUInt64, 0x0A: VdfInt64}
+
+
+def _find_cstring_end(buf, pos: int) -> int:
+    """Returns the offset of the NUL byte terminating the string starting at pos."""
+    end = buf.find(BIN_NONE, pos)
+    if end < 0:
+        raise ValueError(f"Unterminated string in binary VDF (offset: {pos})")
+    return end
+
+
+def _find_widestring_end(buf, pos: int) -> int:
+    """Returns the offset of the double NUL terminating a UTF-16 string."""
+    end = buf.find(BIN_NONE * 2, pos)
+    if end < 0:
+        raise ValueError(f"Unterminated wide string in binary VDF (offset: {pos})")
+    return end + (end - pos) % 2
+
+
+def skip_binary_vdf_field(buf, pos: int) -> int:
+    """Returns the offset right behind the binary VDF field starting at pos.
+
+    Nested maps are skipped without decoding any key or value.
+    """
+    depth = 0
+    while True:
+        value_type = buf[pos]
+        pos += 1
+        if value_type == BIN_END_TYPE:
+            depth -= 1
+            if depth <= 0:
+                return pos
+            continue
+        pos = _find_cstring_end(buf, pos) + 1
+        if value_type == BIN_NONE_TYPE:
+            depth += 1
+            continue
+        if value_type == BIN_STRING_TYPE:
+            pos = _find_cstring_end(buf, pos) + 1
+        elif value_type == BIN_WIDESTRING_TYPE:
+            pos = _find_widestring_end(buf, pos) + 2
+        elif value_type in BIN_FIXED_SIZE_TYPES:
+            pos += BIN_FIXED_SIZE_TYPES[value_type].size
+        else:
+            raise ValueError(
+                f"Unknown data type in binary VDF at offset {pos}: {value_type}"
+            )
+        if depth == 0:
+            return pos
+
+
+def parse_binary_vdf(buf, pos: int = 0, end: Optional[int] = None) -> dict:
+    """Decodes binary VDF like vdf.binary_loads, from a bytes or mmap buffer.
+
+    Parsing stops at the end of the root map, at 'end' or at the end of the
+    buffer, whatever comes first.
+    """
+    if end is None:
+        end = len(buf)
+    stack: List[dict] = [{}]
+    while pos < end:
+        value_type = buf[pos]
+        pos += 1
+        if value_type == BIN_END_TYPE:
+            if len(stack) > 1:
+                stack.pop()
+                continue
+            break
+
+        key_end = _find_cstring_end(buf, pos)
+        key = buf[pos:key_end].decode("utf-8", "replace")
+        pos = key_end + 1
+
+        if value_type == BIN_NONE_TYPE:
+            nested = stack[-1].get(key)
+            if not isinstance(nested, dict):
+                nested = {}
+                stack[-1][key] = nested
+            stack.append(nested)
+        elif value_type == BIN_STRING_TYPE:
+            value_end = _find_cstring_end(buf, pos)
+            stack[-1][key] = buf[pos:value_end].decode("utf-8", "replace")
+            pos = value_end + 1
+        elif value_type == BIN_WIDESTRING_TYPE:
+            value_end = _find_widestring_end(buf, pos)
+            stack[-1][key] = buf[pos:value_end].decode("utf-16")
+            pos = value_end + 2
+        elif value_type in BIN_FIXED_SIZE_TYPES:
+            value_struct = BIN_FIXED_SIZE_TYPES[value_type]
+            value = value_struct.unpack_from(buf, pos)[0]
+            pos += value_struct.size
+            if value_type in BIN_INT_WRAPPERS:
+                value = BIN_INT_WRAPPERS[value_type](value)
+            stack[-1][key] = value
+        else:
+            raise ValueError(
+                f"Unknown data type in binary VDF at offset {pos - 1}: {value_type}"
+            )
+
+    if len(stack) != 1:
+        raise ValueError("Reached end of data, but binary VDF is incomplete")
+    return stack[0]
+
+
+def encode_binary_vdf_field(key: str, value) -> bytes:
+    """Encodes a single key/value pair exactly like vdf.binary_dump does."""
+    encoded_key = key.encode("utf-8") + BIN_NONE
+    if isinstance(value, dict):
+        return (
+            BIN_NONE
+            + encoded_key
+            + b"".join(
+                encode_binary_vdf_field(nested_key, nested_value)
+                for nested_key, nested_value in value.items()
+            )
+            + BIN_END
+        )
+    if isinstance(value, VdfUInt64):
+        return b"\x07" + encoded_key + BIN_UINT64.pack(value)
+    if isinstance(value, VdfInt64):
+        return b"\x0a" + encoded_key + BIN_INT64.pack(value)
+    if isinstance(value, str):
+        try:
+            return b"\x01" + encoded_key + value.encode("utf-8") + BIN_NONE
+        except UnicodeEncodeError:
+            return b"\x05" + encoded_key + value.encode("utf-16") + BIN_NONE * 2
+    if isinstance(value, float):
+        return b"\x03" + encoded_key + BIN_FLOAT32.pack(value)
+    if isinstance(value, int):
+        if isinstance(value, VdfColor):
+            value_type = b"\x06"
+        elif isinstance(value, VdfPointer):
+            value_type = b"\x04"
+        else:
+            value_type = b"\x02"
+        return value_type + encoded_key + BIN_INT32.pack(value)
+    raise TypeError(f"Unsupported type in binary VDF: {type(value)}")
+
+
+def dump_binary_vdf(data: dict) -> bytes:
+    """Encodes a dict to binary VDF, byte-for-byte like vdf.binary_dumps."""
+    if not data:
+        return b""
+    return (
+        b"".join(encode_binary_vdf_field(key, value) for key, value in data.items())
+        + BIN_END
+    )
+
+
+class ShortcutsVdfScan:
+    """Record level view on the raw bytes of a shortcuts.vdf file.
+
+    Records (the top level shortcut entries) are located by skipping over their
+    fields, they are only decoded on demand. Works on bytes as well as on an
+    mmap, so large files never need to be materialized as nested dicts.
+    """
+
+    def __init__(self, buf: Any):
+        self.buf = buf
+        self.wrapped = (
+            len(buf) == 0 or buf[: len(SHORTCUTS_VDF_ROOT)] == SHORTCUTS_VDF_ROOT
+        )
+        self.body_start = len(SHORTCUTS_VDF_ROOT) if self.wrapped and buf else 0
+        self._body_end: Optional[int] = None
+
+    def records(self) -> Iterator[Tuple[str, int, int]]:
+        """Yields (key, start, end) of every record, in file order."""
+        buf = self.buf
+        pos = self.body_start
+        buf_len = len(buf)
+        while pos < buf_len and buf[pos] != BIN_END_TYPE:
+            key_end = _find_cstring_end(buf, pos + 1)
+            end = skip_binary_vdf_field(buf, pos)
+            yield buf[pos + 1 : key_end].decode("utf-8", "replace"), pos, end
+            pos = end
+        self._body_end = pos
+
+    def body_end(self) -> int:
+        """Returns the offset where the closing bytes behind the last record start."""
+        if self._body_end is None:
+            for _ in self.records():
+                pass
+        assert self._body_end is not None
+        return self._body_end
+
+    def entry(self, start: int, end: int):
+        """Decodes the record between start and end, returns its value."""
+        return next(iter(parse_binary_vdf(self.buf, start, end).values()), None)
+
+
+@contextlib.contextmanager
+def mapped_shortcuts_vdf(shortcuts_path: Path) -> Iterator[Any]:
+    """Memory-maps shortcuts.vdf read-only (an empty file yields empty bytes)."""
+    with open(shortcuts_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def append_shortcut_record(
+    shortcuts_path: Path, shortcut_key: str, shortcut_entry: dict, body_end: int
+) -> Tuple[int, int]:
+    """Appends a record by rewriting only the closing bytes of shortcuts.vdf.
+
+    'body_end' is the offset of the closing bytes as reported by
+    ShortcutsVdfScan.body_end() for the current file content. Returns the
+    (start, end) offsets of the new record.
+    """
+    record = encode_binary_vdf_field(shortcut_key, shortcut_entry)
+    if not shortcuts_path.is_file() or shortcuts_path.stat().st_size == 0:
+        write_shortcuts_bytes(shortcuts_path, SHORTCUTS_VDF_ROOT + record + BIN_END * 2)
+        return len(SHORTCUTS_VDF_ROOT), len(SHORTCUTS_VDF_ROOT) + len(record)
+    with mapped_shortcuts_vdf(shortcuts_path) as buf:
+        data = buf[:body_end] + record + buf[body_end:]
+    write_shortcuts_bytes(shortcuts_path, data)
+    return body_end, body_end + len(record)
+
+
+@traced("vdf.write")
+def write_shortcuts_bytes(shortcuts_path: Path, data: bytes):
+    """Writes raw binary VDF bytes to shortcuts.vdf atomically.
+
+    The bytes go to a temporary file in the same directory, which is fsynced
+    and then swapped in with os.replace, so a crash leaves either the old or
+    the new file, never a truncated one. Callers hold locked_shortcuts_vdf().
+    """
+    shortcuts_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = shortcuts_path.with_name(f".{shortcuts_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if shortcuts_path.is_file():
+            shutil.copymode(shortcuts_path, temp_path)
+        os.replace(temp_path, shortcuts_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    directory_fd = os.open(shortcuts_path.parent, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+def shortcuts_vdf_stamp(shortcuts_path: Path) -> Optional[List[int]]:
+    """Returns the file_stamp of shortcuts.vdf, or None if it does not exist."""
+    try:
+        return file_stamp(shortcuts_path)
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def locked_shortcuts_vdf(shortcuts_path: Path) -> Iterator[None]:
+    """Holds the advisory lock serializing all commits to shortcuts.vdf.
+
+    The lock lives on a sidecar file, as every commit replaces shortcuts.vdf
+    itself with a new inode.
+    """
+    shortcuts_path.parent.mkdir(parents=True, exist_ok=True)
+    lock_path = shortcuts_path.with_name(shortcuts_path.name + SHORTCUTS_LOCK_SUFFIX)
+    with open(lock_path, "w") as lock:
+        with span("vdf.lock"):
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def ssm_cache_dir() -> Path:
+    """Returns the XDG cache directory of this tool."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / CACHE_DIR_NAME
+
+
+def file_stamp(path: Path) -> List[int]:
+    """Returns [mtime_ns, size, inode] of a file, used to detect changes."""
+    stat_result = path.stat()
+    return [stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino]
+
+
+def shortcuts_index_path(shortcuts_path: Path) -> Path:
+    """Returns the location of the persistent index of a shortcuts.vdf file."""
+    path_hash = hashlib.sha256(str(shortcuts_path.resolve()).encode("utf-8"))
+    return ssm_cache_dir() / f"shortcuts-index-{path_hash.hexdigest()[:16]}.json"
+
+
+def build_shortcuts_index(buf: Any, stamp: List[int]) -> dict:
+    """Builds the index of a shortcuts.vdf file from its raw bytes.
+
+    The index maps every record key to its (start, end) offsets, and every SSM
+    tag and every short (unsigned 32 bit) appid to the keys using it, in file
+    order. It also remembers where the closing
+    bytes start, which is all an append needs.
+    """
+    scan = ShortcutsVdfScan(buf)
+    index: dict = {
+        "version": SHORTCUTS_INDEX_VERSION,
+        "stamp": stamp,
+        "records": {},
+        "tags": {},
+        "appids": {},
+    }
+    for key, start, end in scan.records():
+        index["records"][key] = [start, end]
+        _index_shortcut_entry(index, key, scan.entry(start, end))
+    index["body_end"] = scan.body_end()
+    return index
+
+
+def _index_shortcut_entry(index: dict, key: str, shortcut_entry):
+    """Adds the SSM tags and the appid of a shortcut entry to the index."""
+    if not isinstance(shortcut_entry, dict):
+        return
+    tags = shortcut_entry.get("tags")
+    if isinstance(tags, dict):
+        for tag in tags.values():
+            if isinstance(tag, str) and tag.startswith(f"{TAG_PREFIX}_"):
+                tag_keys = index["tags"].setdefault(tag, [])
+                if key not in tag_keys:
+                    tag_keys.append(key)
+    appid = shortcut_entry.get("appid")
+    if isinstance(appid, int):
+        index["appids"].setdefault(str(appid & 0xFFFFFFFF), []).append(key)
+
+
+def add_to_shortcuts_index(
+    index: dict, key: str, shortcut_entry: dict, start: int, end: int
+):
+    """Records a record appended at (start, end) in the index."""
+    index["records"][key] = [start, end]
+    _index_shortcut_entry(index, key, shortcut_entry)
+    index["body_end"] = end
+
+
+def remove_from_shortcuts_index(index: dict, key: str):
+    """Drops a record cut out of the file from the index, shifting later offsets."""
+    start, end = index["records"].pop(key)
+    removed_length = end - start
+    for offsets in index["records"].values():
+        if offsets[0] >= end:
+            offsets[0] -= removed_length
+            offsets[1] -= removed_length
+    index["body_end"] -= removed_length
+    for key_lists in (index["tags"], index["appids"]):
+        for value, keys in list(key_lists.items()):
+            if key in keys:
+                keys.remove(key)
+                if not keys:
+                    del key_lists[value]
+
+
+def save_shortcuts_index(shortcuts_path: Path, index: dict):
+    """Persists the index; failing to do so only costs a rebuild later."""
+    index_path = shortcuts_index_path(shortcuts_path)
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, separators=(",", ":"))
+        os.replace(temp_path, index_path)
+    except OSError as e:
+        print(f"WARNING: Could not save shortcuts index {index_path}: {e}")
+
+
+@traced("vdf.index")
+def load_shortcuts_index(shortcuts_path: Path) -> Optional[dict]:
+    """Returns an up to date index of shortcuts.vdf, or None if it does not exist.
+
+    The persisted index is used as long as the file's mtime, size and inode
+    still match; otherwise it is rebuilt from the file and saved again.
+    """
+    try:
+        stamp = file_stamp(shortcuts_path)
+    except FileNotFoundError:
+        return None
+    try:
+        with open(shortcuts_index_path(shortcuts_path), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if (
+            isinstance(index, dict)
+            and index.get("version") == SHORTCUTS_INDEX_VERSION
+            and index.get("stamp") == stamp
+        ):
+            return index
+    except (OSError, ValueError):
+        pass
+
+    log_info(f"Rebuilding shortcuts index for {shortcuts_path}.")
+    with mapped_shortcuts_vdf(shortcuts_path) as buf:
+        index = build_shortcuts_index(buf, stamp)
+    save_shortcuts_index(shortcuts_path, index)
+    return index
+
+
+@traced("vdf.load")
+def load_shortcuts_vdf(shortcuts_path: Path) -> Tuple[dict, bool]:
+    """Loads shortcuts.vdf and returns (shortcuts, wrapped).
+
+    'wrapped' tells whether the entries live below a top level 'shortcuts' key,
+    so they can be written back in the same layout. A missing file yields an
+    empty, wrapped structure.
+    """
+    if not shortcuts_path.is_file():
+        return {}, True
+    with mapped_shortcuts_vdf(shortcuts_path) as buf:
+        if not buf:
+            return {}, True
+        loaded_data = parse_binary_vdf(buf)
+    shortcuts = loaded_data.get("shortcuts", loaded_data)
+    if not isinstance(shortcuts, dict):
+        shortcuts = {}
+    return shortcuts, "shortcuts" in loaded_data
+
+
+def write_shortcuts_vdf(shortcuts_path: Path, shortcuts: dict, wrapped: bool):
+    """Writes the shortcuts back to shortcuts.vdf in the layout they were read in."""
+    data_to_write_back = {"shortcuts": shortcuts} if wrapped else shortcuts
+    with span("vdf.encode"):
+        encoded = dump_binary_vdf(data_to_write_back)
+    write_shortcuts_bytes(shortcuts_path, encoded)
+
+
+def update_shortcuts_vdf(
+    shortcuts_path: Path,
+    apply_changes: Callable[[dict], bool],
+    loaded: Optional[Tuple[dict, bool, Optional[List[int]]]] = None,
+) -> Tuple[dict, bool]:
+    """Commits in-memory changes to shortcuts.vdf as an optimistic transaction.
+
+    'apply_changes' mutates the shortcuts and returns whether anything changed.
+    The file is read without holding the lock (or 'loaded' gives the
+    (shortcuts, wrapped, stamp) read earlier). If the file changed by the time
+    the lock is held, it is read again and 'apply_changes' runs again on the
+    fresh entries, so concurrent writers never lose each other's updates.
+    Returns the committed shortcuts and whether the file was written.
+    """
+    if loaded is None:
+        read_stamp = shortcuts_vdf_stamp(shortcuts_path)
+        shortcuts, wrapped = load_shortcuts_vdf(shortcuts_path)
+    else:
+        shortcuts, wrapped, read_stamp = loaded
+    if not apply_changes(shortcuts):
+        return shortcuts, False
+    with locked_shortcuts_vdf(shortcuts_path):
+        if shortcuts_vdf_stamp(shortcuts_path) != read_stamp:
+            log_info(
+                f"{shortcuts_path} changed since it was read, re-applying the changes."
+            )
+            shortcuts, wrapped = load_shortcuts_vdf(shortcuts_path)
+            if not apply_changes(shortcuts):
+                return shortcuts, False
+        write_shortcuts_vdf(shortcuts_path, shortcuts, wrapped)
+    return shortcuts, True
+
+
+@traced("vdf.lookup")
+def find_shortcut_key_by_tag(shortcuts: dict, tag_to_find: str) -> Optional[str]:
+    """Returns the key of the first shortcut carrying the given tag."""
+    for key, entry_dict in shortcuts.items():
+        if (
+            isinstance(entry_dict, dict)
+            and tag_to_find in entry_dict.get("tags", {}).values()
+        ):
+            return key
+    return None
+
+
+def next_shortcut_key(shortcuts: dict) -> str:
+    """Returns the next free numeric key for a new shortcut entry."""
+    numeric_keys = [int(k) for k in shortcuts.keys() if k.isdigit()]
+    return str(max(numeric_keys) + 1) if numeric_keys else "0"
+
+
+def build_appid_map(shortcuts: dict) -> dict:
+    """Maps every short (unsigned 32 bit) appid to the keys of the shortcuts using it."""
+    appid_map: dict = {}
+    for key, shortcut_entry in shortcuts.items():
+        if isinstance(shortcut_entry, dict) and isinstance(
+            shortcut_entry.get("appid"), int
+        ):
+            appid_map.setdefault(str(shortcut_entry["appid"] & 0xFFFFFFFF), []).append(
+                key
+            )
+    return appid_map
+
+
+def describe_appid_collision(shortcuts: dict, appid: str, keys: List[str]) -> str:
+    """Describes the shortcuts sharing a short appid, for error messages."""
+    users = ", ".join(
+        f"'{shortcuts[key].get('AppName', '') if key in shortcuts else '?'}' (Index: {key})"
+        for key in keys
+    )
+    return f"appid {appid} is already used by {users}, its artwork would be overwritten"
+
+
+def build_shortcut_entry(
+    grid_path: Path,
+    flatpak_appid_tag: str,
+    app_name_param: str,
+    exe_param: str,
+    launch_options_param: str,
+    icon_source_param: Optional[str],
+) -> Tuple[dict, str]:
+    """Builds a VDF shortcut entry and returns it with its artwork short AppID."""
+    clean_exe_for_id_gen = exe_param.strip('"')
+    clean_name_for_id_gen = app_name_param.strip('"')
+
+    artwork_short_id_str = generate_short_appid_for_artwork(
+        clean_exe_for_id_gen, clean_name_for_id_gen
+    )
+    log_info(f"Generated Short AppID for Artwork: {artwork_short_id_str}")
+    vdf_entry_appid_int = generate_appid_for_vdf_entry(
+        clean_exe_for_id_gen, clean_name_for_id_gen
+    )
+    log_info(f"Generated 'appid' for VDF entry: {vdf_entry_appid_int}")
+
+    icon_path_in_vdf = ""
+    if icon_source_param:
+        icon_path_in_vdf = str(grid_path / f"{artwork_short_id_str}_icon.png")
+
+    shortcut_entry = {
+        "appid": vdf_entry_appid_int,
         "AppName": app_name_param,
         "Exe": exe_param,
         "StartDir": os.path.dirname(exe_param) if os.path.isabs(exe_param) else ".",
@@ -562,187 +2156,1939 @@ def add_shortcut(
         "DevkitOverrideAppID": 0,
         "LastPlayTime": 0,
         "FlatpakAppID": flatpak_appid_tag,
-        "tags": {"0": tag_to_find},
+        "tags": {"0": f"{TAG_PREFIX}_{flatpak_appid_tag}"},
+    }
+    if not os.path.isabs(exe_param) and shortcut_entry["StartDir"] == ".":
+        print(
+            f"WARNING: Exe path '{exe_param}' is not absolute. StartDir is set to '.'"
+        )
+    return shortcut_entry, artwork_short_id_str
+
+
+def delete_shortcut_artwork(grid_path: Path, shortcut_entry: dict):
+    """Deletes the generated grid artwork belonging to a shortcut entry."""
+    exe_for_artwork_id = shortcut_entry.get("Exe", "").strip('"')
+    name_for_artwork_id = shortcut_entry.get("AppName", "").strip('"')
+    if not (exe_for_artwork_id and name_for_artwork_id):
+        return
+    try:
+        artwork_appid_str_to_delete = generate_short_appid_for_artwork(
+            exe_for_artwork_id, name_for_artwork_id
+        )
+        log_info(
+            f"Attempting to delete artwork for Short AppID {artwork_appid_str_to_delete}"
+        )
+        for suffix in ARTWORK_FILENAME_SUFFIXES.values():
+            for _, extension in ARTWORK_FORMATS.values():
+                art_path = (
+                    grid_path / f"{artwork_appid_str_to_delete}{suffix}{extension}"
+                )
+                try:
+                    art_path.unlink()
+                except FileNotFoundError:
+                    continue
+                log_info(f"Deleting artwork: {art_path}")
+        forget_artwork_cache_entries(grid_path, {artwork_appid_str_to_delete})
+    except Exception as e_art:
+        print(f"WARNING: Failed to delete artwork: {e_art}", file=sys.stderr)
+
+
+def shortcut_artwork_ids(shortcuts: dict, ssm_only: bool = True) -> set:
+    """Returns the artwork short appids of the given shortcuts.
+
+    Both the id derived from Exe and AppName and the stored 'appid' are taken,
+    so artwork of shortcuts created by Steam itself is recognised as well.
+    """
+    artwork_ids = set()
+    for shortcut_entry in shortcuts.values():
+        if not isinstance(shortcut_entry, dict):
+            continue
+        if ssm_only and not any(
+            str(tag).startswith(f"{TAG_PREFIX}_")
+            for tag in shortcut_entry.get("tags", {}).values()
+        ):
+            continue
+        exe = str(shortcut_entry.get("Exe", "")).strip('"')
+        name = str(shortcut_entry.get("AppName", "")).strip('"')
+        if exe and name:
+            artwork_ids.add(generate_short_appid_for_artwork(exe, name))
+        if isinstance(shortcut_entry.get("appid"), int):
+            artwork_ids.add(str(shortcut_entry["appid"] & 0xFFFFFFFF))
+    return artwork_ids
+
+
+def collect_artwork_garbage(
+    userdata_path: Path, scope: str = "ssm", dry_run: bool = False
+) -> bool:
+    """Deletes (or with 'dry_run' only reports) orphaned grid artwork.
+
+    config/grid is read in a single os.scandir pass. With scope 'ssm' only
+    artwork this tool rendered (listed in its artwork cache) is considered, and
+    it is orphaned once no SSM-tagged shortcut uses it anymore. With scope 'all'
+    every non-Steam shortcut artwork file is considered (short appids have the
+    top bit set, artwork of real Steam games is never touched) and is orphaned
+    once no shortcut at all uses it.
+    """
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    grid_path = userdata_path / "config/grid"
+    try:
+        shortcuts, _ = load_shortcuts_vdf(shortcuts_path)
+    except Exception as e:
+        print(f"ERROR: Failed reading {shortcuts_path}: {e}", file=sys.stderr)
+        return False
+    valid_ids = shortcut_artwork_ids(shortcuts, ssm_only=scope == "ssm")
+    rendered_ids = set(load_artwork_cache(grid_path)["entries"])
+    artwork_name = re.compile(
+        r"(\d+)(?:%s)\.(?:png|jpg|jpeg)"
+        % "|".join(re.escape(suffix) for suffix in ARTWORK_FILENAME_SUFFIXES.values())
+    )
+
+    scanned_files = 0
+    orphaned: List[Tuple[str, str, int]] = []
+    try:
+        with span("gc.scan"), os.scandir(grid_path) as grid_entries:
+            for grid_entry in grid_entries:
+                scanned_files += 1
+                match = artwork_name.fullmatch(grid_entry.name)
+                if not match or match.group(1) in valid_ids:
+                    continue
+                short_id = match.group(1)
+                if scope == "ssm" and short_id not in rendered_ids:
+                    continue
+                if scope == "all" and int(short_id) < 0x80000000:
+                    continue
+                if not grid_entry.is_file(follow_symlinks=False):
+                    continue
+                orphaned.append((short_id, grid_entry.path, grid_entry.stat().st_size))
+    except FileNotFoundError:
+        log_info(f"{grid_path} does not exist, nothing to collect.")
+        return True
+
+    reclaimed_bytes = 0
+    orphaned_ids = set()
+    with span("gc.delete"):
+        for short_id, file_path, file_size in orphaned:
+            if dry_run:
+                log_info(f"Would delete orphaned artwork: {file_path}")
+            else:
+                try:
+                    os.unlink(file_path)
+                except OSError as e:
+                    print(
+                        f"WARNING: Could not delete {file_path}: {e}", file=sys.stderr
+                    )
+                    continue
+                log_info(f"Deleted orphaned artwork: {file_path}")
+            reclaimed_bytes += file_size
+            orphaned_ids.add(short_id)
+        if not dry_run and orphaned_ids & rendered_ids:
+            forget_artwork_cache_entries(grid_path, orphaned_ids)
+
+    log_info(
+        f"Scanned {scanned_files} file(s) in {grid_path}: "
+        f"{len(orphaned)} orphaned file(s) of {len(orphaned_ids)} app(s), "
+        f"{reclaimed_bytes} bytes {'reclaimable' if dry_run else 'reclaimed'}."
+    )
+    return True
+
+
+def _report_existing_shortcut(index: Optional[dict], flatpak_appid_tag: str) -> bool:
+    """Tells (and reports) whether the index already has a shortcut for the tag."""
+    tag_to_find = f"{TAG_PREFIX}_{flatpak_appid_tag}"
+    with span("vdf.lookup"):
+        existing_keys = index["tags"].get(tag_to_find) if index else None
+    if not existing_keys:
+        return False
+    print(
+        f"WARNING: Shortcut for AppID Tag '{flatpak_appid_tag}' (Tag: '{tag_to_find}') seems to already exist (Index: {existing_keys[0]}). Skipping add."
+    )
+    return True
+
+
+def _report_appid_collision(
+    index: Optional[dict], flatpak_appid_tag: str, shortcut_entry: dict
+) -> bool:
+    """Tells (and reports) whether the index has another shortcut with the same appid."""
+    appid = str(shortcut_entry["appid"] & 0xFFFFFFFF)
+    with span("vdf.lookup"):
+        colliding_keys = index["appids"].get(appid) if index else None
+    if not colliding_keys:
+        return False
+    print(
+        f"ERROR: Cannot add '{flatpak_appid_tag}': appid {appid} is already used by the shortcut(s) with index {', '.join(colliding_keys)}, its artwork would be overwritten. Use a different --name.",
+        file=sys.stderr,
+    )
+    return True
+
+
+def add_shortcut(
+    userdata_path: Path,
+    flatpak_appid_tag: str,
+    app_name_param: str,
+    exe_param: str,
+    launch_options_param: str,
+    icon_source_param: str,
+    watermark_logo_param: Optional[str] = None,  # mypy fix: Optional[str]
+):
+    """Adds a shortcut to Steam.
+
+    The duplicate check and the append position come from the persistent
+    shortcuts index; the new entry is spliced into the raw bytes, existing
+    entries are never decoded or re-encoded. If shortcuts.vdf changed between
+    reading the index and taking the commit lock, the checks run again on the
+    current file.
+    """
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    grid_path = userdata_path / "config/grid"
+
+    index: Optional[dict] = None
+    if not shortcuts_path.is_file():
+        log_info(f"{shortcuts_path} does not exist, creating new.")
+    else:
+        try:
+            index = load_shortcuts_index(shortcuts_path)
+        except Exception as e:
+            print(f"ERROR: Failed reading {shortcuts_path}: {e}", file=sys.stderr)
+            return False
+    if _report_existing_shortcut(index, flatpak_appid_tag):
+        return True
+
+    shortcut_entry, artwork_short_id_str = build_shortcut_entry(
+        grid_path,
+        flatpak_appid_tag,
+        app_name_param,
+        exe_param,
+        launch_options_param,
+        icon_source_param,
+    )
+    if _report_appid_collision(index, flatpak_appid_tag, shortcut_entry):
+        return False
+
+    try:
+        with locked_shortcuts_vdf(shortcuts_path):
+            if shortcuts_vdf_stamp(shortcuts_path) != (
+                index["stamp"] if index else None
+            ):
+                log_info(
+                    f"{shortcuts_path} changed since it was read, re-applying the add."
+                )
+                index = load_shortcuts_index(shortcuts_path)
+                if _report_existing_shortcut(index, flatpak_appid_tag):
+                    return True
+                if _report_appid_collision(index, flatpak_appid_tag, shortcut_entry):
+                    return False
+            shortcut_key_str = next_shortcut_key(index["records"] if index else {})
+            log_info(f"Shortcut entry created with index {shortcut_key_str}.")
+            record_start, record_end = append_shortcut_record(
+                shortcuts_path,
+                shortcut_key_str,
+                shortcut_entry,
+                index["body_end"] if index else 0,
+            )
+            log_info(f"Successfully wrote to {shortcuts_path}.")
+            if index is not None:
+                add_to_shortcuts_index(
+                    index, shortcut_key_str, shortcut_entry, record_start, record_end
+                )
+                index["stamp"] = file_stamp(shortcuts_path)
+                save_shortcuts_index(shortcuts_path, index)
+            else:
+                load_shortcuts_index(shortcuts_path)
+    except Exception as e:
+        print(f"ERROR: Failed writing to {shortcuts_path}: {e}", file=sys.stderr)
+        return False
+
+    if icon_source_param:
+        if not save_steam_artwork(
+            artwork_short_id_str, icon_source_param, grid_path, watermark_logo_param
+        ):
+            print(
+                f"WARNING: Artwork saving failed, but shortcut was added.",
+                file=sys.stderr,
+            )
+
+    return True
+
+
+def _cut_shortcut_record(
+    shortcuts_path: Path, index: Optional[dict], tag_to_find: str
+) -> Optional[Tuple[str, dict, bytes]]:
+    """Locates the shortcut carrying a tag through the index.
+
+    Returns its key, its decoded entry and the file bytes without its record,
+    or None if no shortcut carries the tag.
+    """
+    with span("vdf.lookup"):
+        shortcut_keys = index["tags"].get(tag_to_find) if index else None
+        if index is None or not shortcut_keys:
+            return None
+        # With duplicated tags the first record is removed, the others stay indexed.
+        shortcut_key = shortcut_keys[0]
+        start, end = index["records"][shortcut_key]
+        with mapped_shortcuts_vdf(shortcuts_path) as buf:
+            record = parse_binary_vdf(buf, start, end)
+            remaining_bytes = buf[:start] + buf[end:]
+    if shortcut_key not in record:
+        raise ValueError("shortcuts index does not match the file")
+    return shortcut_key, record[shortcut_key], remaining_bytes
+
+
+def remove_shortcut(userdata_path: Path, flatpak_appid_tag_to_remove: str):
+    """Removes a shortcut based on its tag.
+
+    The record is located through the shortcuts index and cut out of the raw
+    file bytes, all other entries are written back unchanged without being
+    decoded.
+    """
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    grid_path = userdata_path / "config/grid"
+    log_info(f"Removing shortcut for AppID Tag: {flatpak_appid_tag_to_remove}")
+    if not shortcuts_path.is_file():
+        log_info(f"{shortcuts_path} does not exist. Nothing to remove.")
+        return True
+
+    tag_to_find_for_removal = f"{TAG_PREFIX}_{flatpak_appid_tag_to_remove}"
+    try:
+        index = load_shortcuts_index(shortcuts_path)
+        removal = _cut_shortcut_record(shortcuts_path, index, tag_to_find_for_removal)
+    except Exception as e:
+        print(
+            f"ERROR: Failed reading {shortcuts_path} for removal: {e}", file=sys.stderr
+        )
+        return False
+    if removal is None:
+        log_info(f"No shortcut with tag '{tag_to_find_for_removal}' found for removal.")
+        return True
+
+    try:
+        with locked_shortcuts_vdf(shortcuts_path):
+            if shortcuts_vdf_stamp(shortcuts_path) != (
+                index["stamp"] if index else None
+            ):
+                log_info(
+                    f"{shortcuts_path} changed since it was read, re-applying the removal."
+                )
+                index = load_shortcuts_index(shortcuts_path)
+                removal = _cut_shortcut_record(
+                    shortcuts_path, index, tag_to_find_for_removal
+                )
+                if removal is None:
+                    log_info(
+                        f"Shortcut with tag '{tag_to_find_for_removal}' was removed concurrently."
+                    )
+                    return True
+            shortcut_key_to_delete, shortcut_entry_to_delete, remaining_bytes = removal
+            log_info(
+                f"Shortcut with tag '{tag_to_find_for_removal}' (Index: {shortcut_key_to_delete}) removed from list."
+            )
+            write_shortcuts_bytes(shortcuts_path, remaining_bytes)
+            log_info(f"{shortcuts_path} successfully updated after removal.")
+            assert index is not None
+            remove_from_shortcuts_index(index, shortcut_key_to_delete)
+            index["stamp"] = file_stamp(shortcuts_path)
+            save_shortcuts_index(shortcuts_path, index)
+    except Exception as e:
+        print(
+            f"ERROR: Failed writing to {shortcuts_path} after removal: {e}",
+            file=sys.stderr,
+        )
+        return False
+
+    delete_shortcut_artwork(grid_path, shortcut_entry_to_delete)
+    return True
+
+
+def check_shortcut(userdata_path: Path, flatpak_appid_tag_to_check: str):
+    """Checks if a shortcut with the given tag exists, using the shortcuts index."""
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    log_info(f"Checking for shortcut with AppID Tag: {flatpak_appid_tag_to_check}")
+    if not shortcuts_path.is_file():
+        log_info("shortcuts.vdf does not exist.")
+        return False
+
+    tag_to_find_for_check = f"{TAG_PREFIX}_{flatpak_appid_tag_to_check}"
+    try:
+        index = load_shortcuts_index(shortcuts_path)
+    except Exception as e:
+        print(f"ERROR: Failed reading {shortcuts_path} for check: {e}", file=sys.stderr)
+        return False
+
+    with span("vdf.lookup"):
+        found = index is not None and tag_to_find_for_check in index["tags"]
+    if found:
+        log_info("Shortcut found.")
+        return True
+
+    log_info("Shortcut not found.")
+    return False
+
+
+def shortcut_summary(key: str, shortcut_entry: dict) -> dict:
+    """Returns all LIST_FIELDS of a shortcut entry.
+
+    'appid_tag' is taken from the SSM tag, so it is None for shortcuts not
+    managed by this tool.
+    """
+    tags = shortcut_entry.get("tags")
+    tag_values = [str(tag) for tag in tags.values()] if isinstance(tags, dict) else []
+    ssm_tag = next(
+        (tag for tag in tag_values if tag.startswith(f"{TAG_PREFIX}_")), None
+    )
+    appid = shortcut_entry.get("appid")
+    if not isinstance(appid, int):
+        appid = None
+    return {
+        "key": key,
+        "appid_tag": ssm_tag[len(TAG_PREFIX) + 1 :] if ssm_tag else None,
+        "managed": ssm_tag is not None,
+        "name": str(shortcut_entry.get("AppName", "")),
+        "exe": str(shortcut_entry.get("Exe", "")),
+        "start_dir": str(shortcut_entry.get("StartDir", "")),
+        "params": str(shortcut_entry.get("LaunchOptions", "")),
+        "icon": str(shortcut_entry.get("icon", "")),
+        "appid": appid,
+        "artwork_id": str(appid & 0xFFFFFFFF) if appid is not None else None,
+        "tags": tag_values,
     }
-    if not os.path.isabs(exe_param) and shortcut_entry["StartDir"] == ".":
+
+
+def list_shortcuts(
+    userdata_path: Path,
+    tag_prefix: Optional[str] = None,
+    ssm_only: bool = False,
+    exe_contains: Optional[str] = None,
+    name_contains: Optional[str] = None,
+    fields: Sequence[str] = LIST_DEFAULT_FIELDS,
+    count_only: bool = False,
+    output_stream: Any = None,
+) -> Optional[int]:
+    """Writes the matching shortcuts as JSON lines, in file order.
+
+    The memory-mapped shortcuts.vdf is walked record by record and only one
+    record is decoded at a time, so memory use does not grow with the number
+    of shortcuts. With 'ssm_only' or a 'tag_prefix', records not containing a
+    matching SSM tag are skipped by a byte search before being decoded. Name
+    and exe filters are case-insensitive substring matches. With 'count_only'
+    a single {"count": N} line is written instead. Returns the number of
+    matches, or None if shortcuts.vdf could not be read.
+    """
+    output_stream = output_stream or sys.stdout
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    needle = None
+    if ssm_only or tag_prefix:
+        needle = BIN_NONE + f"{TAG_PREFIX}_{tag_prefix or ''}".encode("utf-8")
+    exe_contains = exe_contains.casefold() if exe_contains else None
+    name_contains = name_contains.casefold() if name_contains else None
+    # Counting all shortcuts only needs the record boundaries.
+    decode = not count_only or needle or exe_contains or name_contains
+
+    matches = 0
+    if shortcuts_path.is_file():
+        try:
+            with mapped_shortcuts_vdf(shortcuts_path) as buf, span("vdf.list"):
+                scan = ShortcutsVdfScan(buf)
+                for key, start, end in scan.records():
+                    if needle is not None and buf.find(needle, start, end) < 0:
+                        continue
+                    if not decode:
+                        matches += 1
+                        continue
+                    shortcut_entry = scan.entry(start, end)
+                    if not isinstance(shortcut_entry, dict):
+                        continue
+                    summary = shortcut_summary(key, shortcut_entry)
+                    if needle is not None and not (
+                        summary["managed"]
+                        and summary["appid_tag"].startswith(tag_prefix or "")
+                    ):
+                        continue
+                    if exe_contains and exe_contains not in summary["exe"].casefold():
+                        continue
+                    if (
+                        name_contains
+                        and name_contains not in summary["name"].casefold()
+                    ):
+                        continue
+                    matches += 1
+                    if not count_only:
+                        output_stream.write(
+                            json.dumps({field: summary[field] for field in fields})
+                            + "\n"
+                        )
+        except BrokenPipeError:
+            # The reader went away (e.g. '| head'), not a read error.
+            raise
+        except Exception as e:
+            print(f"ERROR: Failed reading {shortcuts_path}: {e}", file=sys.stderr)
+            return None
+    else:
+        log_info("shortcuts.vdf does not exist.")
+
+    if count_only:
+        output_stream.write(json.dumps({"count": matches}) + "\n")
+    output_stream.flush()
+    return matches
+
+
+def verify_shortcuts(userdata_path: Path) -> bool:
+    """Reports shortcuts whose appid no longer matches their Exe and AppName.
+
+    Such entries (e.g. edited by hand) are looked up under another artwork id
+    than the one the artwork was generated for. Shortcuts sharing an appid are
+    reported as well. Returns True if no problem was found.
+    """
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    try:
+        shortcuts, _ = load_shortcuts_vdf(shortcuts_path)
+    except Exception as e:
+        print(f"ERROR: Failed reading {shortcuts_path}: {e}", file=sys.stderr)
+        return False
+
+    problems = 0
+    for key, shortcut_entry in shortcuts.items():
+        if not isinstance(shortcut_entry, dict) or not isinstance(
+            shortcut_entry.get("appid"), int
+        ):
+            continue
+        exe = str(shortcut_entry.get("Exe", "")).strip('"')
+        name = str(shortcut_entry.get("AppName", "")).strip('"')
+        expected_appid = generate_appid_for_vdf_entry(exe, name)
+        if (shortcut_entry["appid"] - expected_appid) & 0xFFFFFFFF:
+            problems += 1
+            print(
+                f"VERIFY: #{key} '{name}': stored appid {shortcut_entry['appid']} does not match Exe/AppName (expected {expected_appid})."
+            )
+    for appid, keys in build_appid_map(shortcuts).items():
+        if len(keys) > 1:
+            problems += 1
+            print(
+                f"VERIFY: appid {appid} is shared by the shortcuts with index {', '.join(keys)}."
+            )
+    log_info(
+        f"Verified {len(shortcuts)} shortcut(s) in {shortcuts_path}: {problems} problem(s)."
+    )
+    return problems == 0
+
+
+def load_manifest(manifest_path: Path) -> List[dict]:
+    """Loads a manifest of operations for the 'apply' action.
+
+    The manifest is a JSON list of operations, or an object holding that list
+    under 'operations'. Every operation mirrors the CLI arguments, e.g.
+    {"action": "add", "appid_tag": "...", "name": "...", "icon": "...",
+    "exe": "...", "params": "...", "watermark": "..."} or
+    {"action": "remove", "appid_tag": "..."}.
+    """
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest_data = json.load(f)
+    if isinstance(manifest_data, dict):
+        manifest_data = manifest_data.get("operations")
+    if not isinstance(manifest_data, list):
+        raise ValueError("manifest must be a list of operations")
+    return manifest_data
+
+
+def _apply_operation(
+    shortcuts: dict, grid_path: Path, operation, appid_map: dict
+) -> Tuple[str, str]:
+    """Applies a single manifest operation in memory and returns (status, message).
+
+    'appid_map' (see build_appid_map) is kept up to date, so a batch builds it
+    once and detects appid collisions with existing shortcuts as well as within
+    the batch.
+    """
+    if not isinstance(operation, dict):
+        return "invalid", "operation is not an object"
+    action = operation.get("action")
+    appid_tag = operation.get("appid_tag")
+    if not appid_tag:
+        return "invalid", "'appid_tag' is required"
+    tag_to_find = f"{TAG_PREFIX}_{appid_tag}"
+
+    if action == "add":
+        if not all(operation.get(field) for field in ("name", "icon", "params")):
+            return "invalid", "'name', 'icon' and 'params' are required for 'add'"
+        existing_key = find_shortcut_key_by_tag(shortcuts, tag_to_find)
+        if existing_key is not None:
+            return "exists", f"already present (Index: {existing_key})"
+        shortcut_entry, _ = build_shortcut_entry(
+            grid_path,
+            appid_tag,
+            operation["name"],
+            operation.get("exe") or DEFAULT_EXE,
+            operation["params"],
+            operation["icon"],
+        )
+        appid = str(shortcut_entry["appid"] & 0xFFFFFFFF)
+        if appid_map.get(appid):
+            return "collision", describe_appid_collision(
+                shortcuts, appid, appid_map[appid]
+            )
+        shortcut_key_str = next_shortcut_key(shortcuts)
+        shortcuts[shortcut_key_str] = shortcut_entry
+        appid_map.setdefault(appid, []).append(shortcut_key_str)
+        return "added", f"Index: {shortcut_key_str}"
+
+    if action == "remove":
+        existing_key = find_shortcut_key_by_tag(shortcuts, tag_to_find)
+        if existing_key is None:
+            return "not_found", "nothing to remove"
+        removed_appid = shortcuts.pop(existing_key).get("appid")
+        if isinstance(removed_appid, int):
+            appid_keys = appid_map.get(str(removed_appid & 0xFFFFFFFF), [])
+            if existing_key in appid_keys:
+                appid_keys.remove(existing_key)
+        return "removed", f"Index: {existing_key}"
+
+    return "invalid", f"unsupported action '{action}'"
+
+
+def _operation_result(index: int, operation, status: str, message: str) -> dict:
+    """Returns the result dict of one manifest operation."""
+    return {
+        "index": index,
+        "action": operation.get("action") if isinstance(operation, dict) else None,
+        "appid_tag": (
+            operation.get("appid_tag") if isinstance(operation, dict) else None
+        ),
+        "status": status,
+        "message": message,
+    }
+
+
+def apply_manifest_transaction(
+    userdata_path: Path,
+    operations: List[dict],
+    watermark_logo_param: Optional[str] = None,
+) -> Tuple[List[dict], List[Tuple[dict, ArtworkJob]]]:
+    """Applies many add/remove operations with one shortcuts.vdf read and write.
+
+    All operations are applied to the in-memory shortcuts first. If another
+    process committed in the meantime, they are applied again to its result
+    (see update_shortcuts_vdf). Only after the single write succeeded is the
+    artwork of removed shortcuts deleted. Returns
+    one result dict per operation and the artwork still to be rendered for added
+    shortcuts, as (result, artwork job) pairs.
+    """
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    grid_path = userdata_path / "config/grid"
+
+    try:
+        read_stamp = shortcuts_vdf_stamp(shortcuts_path)
+        shortcuts, wrapped = load_shortcuts_vdf(shortcuts_path)
+    except Exception as e:
+        print(f"ERROR: Failed reading {shortcuts_path}: {e}", file=sys.stderr)
+        return [
+            _operation_result(index, operation, "failed", f"read failed: {e}")
+            for index, operation in enumerate(operations)
+        ], []
+
+    entries_before: dict = {}
+    results: List[dict] = []
+
+    def apply_operations(shortcuts: dict) -> bool:
+        entries_before.clear()
+        entries_before.update(
+            (key, entry) for key, entry in shortcuts.items() if isinstance(entry, dict)
+        )
+        appid_map = build_appid_map(shortcuts)
+        results.clear()
+        for index, operation in enumerate(operations):
+            status, message = _apply_operation(
+                shortcuts, grid_path, operation, appid_map
+            )
+            results.append(_operation_result(index, operation, status, message))
+        return any(result["status"] in ("added", "removed") for result in results)
+
+    try:
+        shortcuts, written = update_shortcuts_vdf(
+            shortcuts_path, apply_operations, (shortcuts, wrapped, read_stamp)
+        )
+        if not written:
+            log_info(f"No changes for {shortcuts_path}, nothing written.")
+            return results, []
+        log_info(f"Successfully wrote to {shortcuts_path}.")
+    except Exception as e:
+        print(f"ERROR: Failed writing to {shortcuts_path}: {e}", file=sys.stderr)
+        for result in results:
+            if result["status"] in ("added", "removed"):
+                result["status"] = "failed"
+                result["message"] = f"write failed: {e}"
+        return results, []
+
+    for key, entry in entries_before.items():
+        if shortcuts.get(key) is not entry:
+            delete_shortcut_artwork(grid_path, entry)
+
+    pending_artwork: List[Tuple[dict, ArtworkJob]] = []
+    for result, operation in zip(results, operations):
+        if result["status"] != "added":
+            continue
+        tag_to_find = f"{TAG_PREFIX}_{operation['appid_tag']}"
+        shortcut_key = find_shortcut_key_by_tag(shortcuts, tag_to_find)
+        if shortcut_key is None:
+            # Removed again by a later operation of the same manifest.
+            continue
+        shortcut_entry = shortcuts[shortcut_key]
+        artwork_short_id_str = generate_short_appid_for_artwork(
+            shortcut_entry["Exe"].strip('"'), shortcut_entry["AppName"].strip('"')
+        )
+        pending_artwork.append(
+            (
+                result,
+                (
+                    artwork_short_id_str,
+                    operation["icon"],
+                    str(grid_path),
+                    operation.get("watermark") or watermark_logo_param,
+                ),
+            )
+        )
+    return results, pending_artwork
+
+
+def _note_artwork_result(result: dict, artwork_saved: bool):
+    if not artwork_saved:
+        result["message"] += ", artwork saving failed"
         print(
-            f"WARNING: Exe path '{exe_param}' is not absolute. StartDir is set to '.'"
+            f"WARNING: Artwork saving failed for '{result['appid_tag']}', but shortcut was added.",
+            file=sys.stderr,
+        )
+
+
+def print_manifest_results(results: List[dict]):
+    """Prints one RESULT line per manifest operation."""
+    for result in results:
+        print(
+            f"RESULT: #{result['index']} {result['action']} '{result['appid_tag']}': {result['status']} ({result['message']})"
+        )
+
+
+def apply_manifest(
+    userdata_path: Path,
+    operations: List[dict],
+    watermark_logo_param: Optional[str] = None,
+    jobs: int = 1,
+) -> List[dict]:
+    """Applies a manifest to one account (see apply_manifest_transaction).
+
+    Artwork for added shortcuts is generated after the write succeeded, using up
+    to 'jobs' processes. Returns one result dict per operation.
+    """
+    results, pending_artwork = apply_manifest_transaction(
+        userdata_path, operations, watermark_logo_param
+    )
+    artwork_saved_flags = render_artwork_batch(
+        [job for _, job in pending_artwork], jobs
+    )
+    for (result, _), artwork_saved in zip(pending_artwork, artwork_saved_flags):
+        _note_artwork_result(result, artwork_saved)
+    print_manifest_results(results)
+    return results
+
+
+class _PerThreadOutput(io.TextIOBase):
+    """A stream writing into the 'buffer' of the current thread, if it has one."""
+
+    def __init__(self, fallback) -> None:
+        import threading
+
+        self.fallback = fallback
+        self.local = threading.local()
+        self.outputs: dict = {}
+
+    def write(self, text: str) -> int:
+        return getattr(self.local, "buffer", self.fallback).write(text)
+
+    def flush(self):
+        self.fallback.flush()
+
+
+def apply_manifest_all_users(
+    user_dirs: List[Path],
+    operations: List[dict],
+    watermark_logo_param: Optional[str] = None,
+    jobs: int = 1,
+) -> List[dict]:
+    """Applies a manifest to several Steam accounts at once.
+
+    Every account gets its own shortcuts.vdf transaction, all accounts are
+    processed concurrently. The artwork of an operation is rendered only once,
+    into the first account that added it, and then hard-linked (or copied) into
+    the grid directories of the other accounts. Returns the result dicts of all
+    accounts, each carrying its 'userdata' directory.
+    """
+    import concurrent.futures
+
+    # The output of every account is collected separately and printed in order,
+    # stdout and stderr each to their own stream.
+    account_output = _PerThreadOutput(sys.stdout)
+    account_errors = _PerThreadOutput(sys.stderr)
+
+    def transaction(
+        userdata_path: Path,
+    ) -> Tuple[List[dict], List[Tuple[dict, ArtworkJob]]]:
+        account_output.local.buffer = io.StringIO()
+        account_errors.local.buffer = io.StringIO()
+        try:
+            return apply_manifest_transaction(
+                userdata_path, operations, watermark_logo_param
+            )
+        except Exception as e:
+            print(f"ERROR: Failed applying to {userdata_path}: {e}", file=sys.stderr)
+            return [
+                _operation_result(index, operation, "failed", str(e))
+                for index, operation in enumerate(operations)
+            ], []
+        finally:
+            account_output.outputs[userdata_path] = account_output.local.buffer
+            account_errors.outputs[userdata_path] = account_errors.local.buffer
+
+    with contextlib.redirect_stdout(account_output), contextlib.redirect_stderr(
+        account_errors
+    ):
+        with concurrent.futures.ThreadPoolExecutor(len(user_dirs)) as pool:
+            transactions = list(pool.map(transaction, user_dirs))
+    for userdata_path in user_dirs:
+        log_info(f"Applying to {userdata_path}:")
+        sys.stdout.write(account_output.outputs[userdata_path].getvalue())
+        sys.stdout.flush()
+        sys.stderr.write(account_errors.outputs[userdata_path].getvalue())
+        sys.stderr.flush()
+
+    rendered_jobs: dict = {}
+    for _, pending_artwork in transactions:
+        for result, job in pending_artwork:
+            rendered_jobs.setdefault(result["index"], job)
+    rendered_indices = list(rendered_jobs)
+    if rendered_indices:
+        log_info(
+            f"Rendering artwork of {len(rendered_indices)} app(s) once for all accounts."
+        )
+    rendered_flags = dict(
+        zip(
+            rendered_indices,
+            render_artwork_batch(
+                [rendered_jobs[index] for index in rendered_indices], jobs
+            ),
+        )
+    )
+
+    all_results: List[dict] = []
+    for userdata_path, (results, pending_artwork) in zip(user_dirs, transactions):
+        log_info(f"Results for {userdata_path}:")
+        for result, job in pending_artwork:
+            rendered_job = rendered_jobs[result["index"]]
+            artwork_saved = rendered_flags[result["index"]]
+            if artwork_saved and job[2] != rendered_job[2]:
+                artwork_saved = place_artwork_in_grid(
+                    job[0], Path(rendered_job[2]), Path(job[2])
+                )
+            _note_artwork_result(result, artwork_saved)
+        print_manifest_results(results)
+        for result in results:
+            result["userdata"] = str(userdata_path)
+        all_results.extend(results)
+    return all_results
+
+
+def load_desired_state(state_path: Path) -> List[dict]:
+    """Loads the desired shortcuts for the 'sync' action.
+
+    The state is a JSON list of shortcuts, or an object holding that list under
+    'shortcuts'. Every shortcut uses the fields of an 'add' operation:
+    {"appid_tag": "...", "name": "...", "params": "...", "exe": "...",
+    "icon": "...", "watermark": "..."}; 'exe', 'icon' and 'watermark' are
+    optional.
+    """
+    with open(state_path, "r", encoding="utf-8") as f:
+        state_data = json.load(f)
+    if isinstance(state_data, dict):
+        state_data = state_data.get("shortcuts")
+    if not isinstance(state_data, list):
+        raise ValueError("state must be a list of shortcuts")
+    seen_tags = set()
+    for position, desired in enumerate(state_data):
+        if not isinstance(desired, dict) or not all(
+            desired.get(field) for field in ("appid_tag", "name", "params")
+        ):
+            raise ValueError(
+                f"shortcut #{position} needs 'appid_tag', 'name' and 'params'"
+            )
+        if desired["appid_tag"] in seen_tags:
+            raise ValueError(f"duplicate appid_tag '{desired['appid_tag']}'")
+        seen_tags.add(desired["appid_tag"])
+    return state_data
+
+
+def _plan_sync(
+    shortcuts: dict,
+    desired_shortcuts: List[dict],
+    grid_path: Path,
+    watermark_logo_param: Optional[str],
+    artwork_entries: dict,
+) -> dict:
+    """Applies the desired state to the in-memory shortcuts (see sync_shortcuts).
+
+    Returns the 'changes' as readable strings, the 'stale_entries' whose artwork
+    is to be deleted, the 'artwork_jobs' to render, the appid 'collisions' the
+    result would contain, whether shortcuts.vdf itself needs a write
+    ('vdf_changed') and the tags whose icon cannot be read ('missing_icons').
+    """
+    current_keys: dict = {}
+    for key, shortcut_entry in shortcuts.items():
+        if not isinstance(shortcut_entry, dict):
+            continue
+        for tag in shortcut_entry.get("tags", {}).values():
+            if str(tag).startswith(f"{TAG_PREFIX}_"):
+                current_keys.setdefault(str(tag), []).append(key)
+                break
+
+    changes: List[str] = []
+    vdf_changed = False
+    touched_keys = set()
+    stale_entries: List[dict] = []
+    artwork_jobs: List[ArtworkJob] = []
+    missing_icons: List[Tuple[str, str]] = []
+    for desired in desired_shortcuts:
+        tag = f"{TAG_PREFIX}_{desired['appid_tag']}"
+        wanted_entry, artwork_short_id_str = build_shortcut_entry(
+            grid_path,
+            desired["appid_tag"],
+            desired["name"],
+            desired.get("exe") or DEFAULT_EXE,
+            desired["params"],
+            desired.get("icon"),
+        )
+        keys = current_keys.pop(tag, [])
+        for duplicate_key in keys[1:]:
+            stale_entries.append(shortcuts.pop(duplicate_key))
+            changes.append(f"removed duplicate '{desired['appid_tag']}'")
+            vdf_changed = True
+        if not keys:
+            shortcut_key = next_shortcut_key(shortcuts)
+            shortcuts[shortcut_key] = wanted_entry
+            touched_keys.add(shortcut_key)
+            vdf_changed = True
+            changes.append(f"added '{desired['appid_tag']}' (Index: {shortcut_key})")
+        else:
+            current_entry = shortcuts[keys[0]]
+            changed_fields = [
+                field
+                for field in SYNC_MANAGED_FIELDS
+                if current_entry.get(field) != wanted_entry[field]
+            ]
+            if changed_fields:
+                if "appid" in changed_fields:
+                    # Name or exe changed: the artwork moves to a new short id.
+                    stale_entries.append(dict(current_entry))
+                for field in SYNC_MANAGED_FIELDS:
+                    current_entry[field] = wanted_entry[field]
+                touched_keys.add(keys[0])
+                vdf_changed = True
+                changes.append(
+                    f"updated '{desired['appid_tag']}' (Index: {keys[0]}): {', '.join(changed_fields)}"
+                )
+
+        if desired.get("icon"):
+            watermark = desired.get("watermark") or watermark_logo_param
+            try:
+                cache_key = artwork_cache_key(
+                    Path(desired["icon"]),
+                    (
+                        Path(watermark)
+                        if watermark and Path(watermark).is_file()
+                        else None
+                    ),
+                )
+            except OSError as e:
+                # Rendering would fail the same way on every run.
+                missing_icons.append((desired["appid_tag"], str(e)))
+                continue
+            if not artwork_is_current(
+                artwork_entries, artwork_short_id_str, grid_path, cache_key
+            ):
+                artwork_jobs.append(
+                    (artwork_short_id_str, desired["icon"], str(grid_path), watermark)
+                )
+                changes.append(f"artwork of '{desired['appid_tag']}'")
+
+    for keys in current_keys.values():
+        for stale_key in keys:
+            stale_entry = shortcuts.pop(stale_key)
+            stale_entries.append(stale_entry)
+            changes.append(
+                f"removed '{stale_entry.get('FlatpakAppID', '')}' (Index: {stale_key})"
+            )
+            vdf_changed = True
+
+    collisions = [
+        (appid, keys)
+        for appid, keys in build_appid_map(shortcuts).items()
+        if len(keys) > 1 and touched_keys.intersection(keys)
+    ]
+    return {
+        "changes": changes,
+        "stale_entries": stale_entries,
+        "artwork_jobs": artwork_jobs,
+        "collisions": collisions,
+        "vdf_changed": vdf_changed,
+        "missing_icons": missing_icons,
+    }
+
+
+def sync_shortcuts(
+    userdata_path: Path,
+    desired_shortcuts: List[dict],
+    watermark_logo_param: Optional[str] = None,
+    jobs: int = 1,
+    dry_run: bool = False,
+) -> bool:
+    """Makes the SSM-tagged shortcuts match the desired state.
+
+    Changed entries are updated in place and keep their key (and the fields
+    managed by Steam, such as LastPlayTime), missing ones are added, stale and
+    duplicate ones removed. Artwork is re-rendered only where its inputs
+    changed. If nothing differs, neither shortcuts.vdf nor the grid directory
+    is written to.
+    """
+    shortcuts_path = userdata_path / "config/shortcuts.vdf"
+    grid_path = userdata_path / "config/grid"
+    artwork_entries = load_artwork_cache(grid_path)["entries"]
+    plan: dict = {}
+
+    def apply_sync(shortcuts: dict) -> bool:
+        plan.clear()
+        plan.update(
+            _plan_sync(
+                shortcuts,
+                desired_shortcuts,
+                grid_path,
+                watermark_logo_param,
+                artwork_entries,
+            )
+        )
+        return plan["vdf_changed"] and not plan["collisions"] and not dry_run
+
+    try:
+        shortcuts, written = update_shortcuts_vdf(shortcuts_path, apply_sync)
+    except Exception as e:
+        print(f"ERROR: Failed updating {shortcuts_path}: {e}", file=sys.stderr)
+        return False
+
+    for appid, keys in plan["collisions"]:
+        print(
+            f"ERROR: {describe_appid_collision(shortcuts, appid, keys)}.",
+            file=sys.stderr,
+        )
+    if plan["collisions"]:
+        print(f"ERROR: Not syncing {shortcuts_path}.", file=sys.stderr)
+        return False
+    for appid_tag, error in plan["missing_icons"]:
+        print(
+            f"WARNING: Icon of '{appid_tag}' cannot be read, keeping its artwork: {error}",
+            file=sys.stderr,
+        )
+
+    changes = plan["changes"]
+    if not changes:
+        log_info(f"{shortcuts_path} is in sync, nothing written.")
+        return True
+    if dry_run:
+        for change in changes:
+            print(f"SYNC: would apply {change}")
+        return True
+
+    if written:
+        log_info(f"Successfully wrote to {shortcuts_path}.")
+        for stale_entry in plan["stale_entries"]:
+            delete_shortcut_artwork(grid_path, stale_entry)
+
+    artwork_jobs = plan["artwork_jobs"]
+    artwork_saved = all(render_artwork_batch(artwork_jobs, jobs))
+    for change in changes:
+        print(f"SYNC: {change}")
+    if not artwork_saved:
+        print("WARNING: Artwork saving failed for some shortcuts.", file=sys.stderr)
+    return artwork_saved
+
+
+def read_operation_batches(
+    input_stream, batch_window: float, batch_size: int
+) -> Iterator[List[Tuple[int, str]]]:
+    """Groups the lines of 'input_stream' into batches of (line number, line).
+
+    A batch is closed 'batch_window' seconds after its first line arrived, once
+    it holds 'batch_size' lines, or at the end of the stream. Blank lines are
+    skipped.
+    """
+    import queue
+    import threading
+
+    lines: Any = queue.Queue()
+
+    def read_lines():
+        for line_number, line in enumerate(iter(input_stream.readline, ""), 1):
+            if line.strip():
+                lines.put((line_number, line))
+        lines.put(None)
+
+    threading.Thread(target=read_lines, daemon=True).start()
+    end_of_stream = False
+    while not end_of_stream:
+        first_line = lines.get()
+        if first_line is None:
+            break
+        batch = [first_line]
+        deadline = time.monotonic() + batch_window
+        while len(batch) < batch_size:
+            try:
+                next_line = lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if next_line is None:
+                end_of_stream = True
+                break
+            batch.append(next_line)
+        yield batch
+
+
+def run_stdin_pipeline(
+    userdata_path: Path,
+    watermark_logo_param: Optional[str] = None,
+    jobs: int = 1,
+    batch_window: float = STDIN_BATCH_WINDOW,
+    batch_size: int = STDIN_BATCH_SIZE,
+    input_stream: Any = None,
+    output_stream: Any = None,
+) -> bool:
+    """Applies a stream of JSON-lines operations in batches.
+
+    Every line holds one manifest operation (see load_manifest). Each batch is
+    committed with a single shortcuts.vdf write, artwork of added shortcuts is
+    rendered in the background while the next batches are read. One JSON result
+    line is written per input line, carrying its 'line' number and the 'id' of
+    the operation if it had one; lines of added shortcuts are written once their
+    artwork is done. Log output goes to stderr. Returns False if any operation
+    was invalid or failed.
+    """
+    import concurrent.futures
+    import threading
+
+    input_stream = input_stream or sys.stdin
+    output_stream = output_stream or sys.stdout
+    output_lock = threading.Lock()
+    all_succeeded = True
+
+    def emit(result: dict):
+        nonlocal all_succeeded
+        if result["status"] in FAILED_STATUSES:
+            all_succeeded = False
+        with output_lock:
+            output_stream.write(json.dumps(result) + "\n")
+            output_stream.flush()
+
+    def render_in_background(pending_artwork: List[Tuple[dict, ArtworkJob]]):
+        artwork_saved_flags = render_artwork_batch(
+            [job for _, job in pending_artwork], jobs
+        )
+        for (result, _), artwork_saved in zip(pending_artwork, artwork_saved_flags):
+            _note_artwork_result(result, artwork_saved)
+            emit(result)
+
+    # Rendering runs on one thread, so artwork of a tag is always written before
+    # a later batch removing that tag deletes it again.
+    render_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    pending_renders: dict = {}
+    with contextlib.redirect_stdout(sys.stderr):
+        for batch_number, batch in enumerate(
+            read_operation_batches(input_stream, batch_window, batch_size), 1
+        ):
+            operations: List[Any] = []
+            line_numbers: List[int] = []
+            for line_number, line in batch:
+                try:
+                    operation = json.loads(line)
+                except ValueError as e:
+                    emit(
+                        {
+                            "line": line_number,
+                            "batch": batch_number,
+                            "status": "invalid",
+                            "message": f"invalid JSON: {e}",
+                        }
+                    )
+                    continue
+                operations.append(operation)
+                line_numbers.append(line_number)
+                if isinstance(operation, dict) and operation.get("action") == "remove":
+                    pending_render = pending_renders.get(operation.get("appid_tag"))
+                    if pending_render is not None:
+                        pending_render.result()
+            if not operations:
+                continue
+
+            log_info(f"Batch {batch_number}: {len(operations)} operation(s).")
+            results, pending_artwork = apply_manifest_transaction(
+                userdata_path, operations, watermark_logo_param
+            )
+            for result, operation, line_number in zip(
+                results, operations, line_numbers
+            ):
+                del result["index"]
+                result.update(line=line_number, batch=batch_number)
+                if isinstance(operation, dict) and "id" in operation:
+                    result["id"] = operation["id"]
+            rendering = {id(result) for result, _ in pending_artwork}
+            for result in results:
+                if id(result) not in rendering:
+                    emit(result)
+            if pending_artwork:
+                pending_render = render_executor.submit(
+                    render_in_background, pending_artwork
+                )
+                for result, _ in pending_artwork:
+                    pending_renders[result["appid_tag"]] = pending_render
+        render_executor.shutdown(wait=True)
+    return all_succeeded
+
+
+def flatpak_installations() -> List[Tuple[str, Path]]:
+    """Returns (name, path) of the system and the user Flatpak installation."""
+    return [
+        (
+            name,
+            Path(os.environ.get(environment_variable) or default_path).expanduser(),
+        )
+        for name, environment_variable, default_path in FLATPAK_INSTALLATIONS
+    ]
+
+
+def read_desktop_entry(desktop_path: Path) -> dict:
+    """Returns the unlocalized keys of the [Desktop Entry] group of a .desktop file."""
+    desktop_entry: dict = {}
+    in_desktop_entry = False
+    with open(desktop_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("["):
+                if in_desktop_entry:
+                    break
+                in_desktop_entry = line == "[Desktop Entry]"
+            elif in_desktop_entry and "=" in line and not line.startswith("#"):
+                key, _, value = line.partition("=")
+                desktop_entry.setdefault(key.strip(), value.strip())
+    return desktop_entry
+
+
+def scan_flatpak_applications(applications_dir: Path) -> dict:
+    """Maps the app IDs of the exported .desktop files to their name and icon name."""
+    applications: dict = {}
+    try:
+        desktop_files = sorted(
+            entry.path
+            for entry in os.scandir(applications_dir)
+            if entry.name.endswith(".desktop")
+        )
+    except OSError:
+        return applications
+    for desktop_path in desktop_files:
+        try:
+            desktop_entry = read_desktop_entry(Path(desktop_path))
+        except OSError:
+            continue
+        if (
+            desktop_entry.get("Type", "Application") != "Application"
+            or desktop_entry.get("NoDisplay") == "true"
+            or desktop_entry.get("Hidden") == "true"
+            or not desktop_entry.get("Name")
+        ):
+            continue
+        app_id = desktop_entry.get("X-Flatpak") or Path(desktop_path).stem
+        # An app can export several .desktop files, the one named after it wins.
+        if app_id in applications and Path(desktop_path).stem != app_id:
+            continue
+        applications[app_id] = {
+            "name": desktop_entry["Name"],
+            "icon_name": desktop_entry.get("Icon") or app_id,
+        }
+    return applications
+
+
+def scan_hicolor_icons(icons_dir: Path) -> dict:
+    """Maps icon names to {pixel size: path} of the PNG icons in a hicolor tree."""
+    icons: dict = {}
+    try:
+        size_dirs = list(os.scandir(icons_dir / "hicolor"))
+    except OSError:
+        return icons
+    for size_dir in size_dirs:
+        size_match = HICOLOR_SIZE_DIR_PATTERN.fullmatch(size_dir.name)
+        if not size_match:
+            continue  # e.g. 'scalable', Pillow cannot decode SVG
+        pixel_size = int(size_match.group(1)) * int(size_match.group(2) or 1)
+        try:
+            icon_entries = list(os.scandir(Path(size_dir.path) / "apps"))
+        except OSError:
+            continue
+        for icon_entry in icon_entries:
+            if icon_entry.name.endswith(".png"):
+                icons.setdefault(icon_entry.name[: -len(".png")], {}).setdefault(
+                    pixel_size, icon_entry.path
+                )
+    return icons
+
+
+def pick_icon(icon_sizes: dict, needed_size: int) -> Optional[str]:
+    """Returns the smallest icon at least 'needed_size' pixels large.
+
+    If none is large enough, the largest one is returned.
+    """
+    if not icon_sizes:
+        return None
+    large_enough = [size for size in icon_sizes if size >= needed_size]
+    return icon_sizes[min(large_enough) if large_enough else max(icon_sizes)]
+
+
+@traced("flatpak.discover")
+def discover_flatpaks() -> List[dict]:
+    """Lists the installed Flatpak apps with the best fitting icon per artwork target.
+
+    The exported applications and hicolor icon trees of all installations are
+    scanned in parallel. Apps of the user installation take precedence over the
+    system installation. Every entry can be used as an operation of 'apply' (with
+    an 'action') or as a shortcut of 'sync': 'icon' is the smallest icon covering
+    every target, 'icons' holds the choice per target.
+    """
+    import concurrent.futures
+
+    installations = flatpak_installations()
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=2 * len(installations)
+    ) as executor:
+        scans = [
+            (
+                name,
+                executor.submit(
+                    scan_flatpak_applications,
+                    path / "exports/share/applications",
+                ),
+                executor.submit(scan_hicolor_icons, path / "exports/share/icons"),
+            )
+            for name, path in installations
+        ]
+        installed: dict = {}
+        all_icons: dict = {}
+        for name, applications_scan, icons_scan in scans:
+            icons = icons_scan.result()
+            for app_id, application in applications_scan.result().items():
+                installed[app_id] = dict(
+                    application,
+                    installation=name,
+                    icon_sizes=icons.get(application["icon_name"], {}),
+                )
+            for icon_name, icon_sizes in icons.items():
+                all_icons.setdefault(icon_name, {}).update(icon_sizes)
+
+    needed_sizes = {
+        target_name: min(app_logo_bbox(target_name)) for target_name in TARGET_SIZES
+    }
+    discovered = []
+    for app_id in sorted(installed):
+        application = installed[app_id]
+        icon_sizes = application["icon_sizes"] or all_icons.get(
+            application["icon_name"], {}
+        )
+        discovered.append(
+            {
+                "appid_tag": app_id,
+                "name": application["name"],
+                "exe": DEFAULT_EXE,
+                "params": f"run {app_id}",
+                "icon": pick_icon(icon_sizes, max(needed_sizes.values())),
+                "icons": {
+                    target_name: pick_icon(icon_sizes, needed_size)
+                    for target_name, needed_size in needed_sizes.items()
+                },
+                "installation": application["installation"],
+            }
         )
+    return discovered
+
+
+def _is_steam_process(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat", "r", encoding="utf-8") as f:
+            stat = f.read()
+    except OSError:
+        return False
+    # "pid (comm) state ...": comm may itself contain spaces or parentheses.
+    name, _, rest = stat.partition(" (")[2].rpartition(")")
+    # A zombie has already exited; it just has not been reaped yet.
+    return name in STEAM_PROCESS_NAMES and rest.split()[:1] != ["Z"]
+
+
+def running_steam_pid() -> Optional[int]:
+    """Returns the pid of a running Steam client, or None.
+
+    The pid files Steam writes are checked first; if none names a live Steam
+    process, /proc is searched for one. Processes outside our pid namespace
+    (e.g. Steam on the host while this runs in a sandbox) cannot be seen.
+    """
+    home = Path.home()
+    for pid_file in STEAM_PID_FILES:
+        try:
+            pid = int((home / pid_file).read_text().strip())
+        except (OSError, ValueError):
+            continue
+        if _is_steam_process(pid):
+            return pid
+    try:
+        proc_entries = os.listdir("/proc")
+    except OSError:
+        return None
+    for entry in proc_entries:
+        if entry.isdigit() and _is_steam_process(int(entry)):
+            return int(entry)
+    return None
+
+
+def wait_for_process_exit(pid: int):
+    """Blocks until the process exits, without polling where pidfds exist."""
+    import select
+
+    try:
+        pid_fd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        # No pidfd support (or the process is already gone): check /proc.
+        while _is_steam_process(pid):
+            time.sleep(DAEMON_POLL_INTERVAL)
+        return
+    try:
+        poller = select.poll()
+        poller.register(pid_fd, select.POLLIN)
+        poller.poll()
+    finally:
+        os.close(pid_fd)
+
+
+def pending_operations_path(userdata_path: Path) -> Path:
+    """Returns the queue of operations deferred while Steam was running."""
+    return userdata_path / "config" / PENDING_OPERATIONS_NAME
+
+
+@contextlib.contextmanager
+def locked_pending_operations(userdata_path: Path) -> Iterator[Path]:
+    """Yields the path of the pending operations queue under an exclusive lock."""
+    queue_path = pending_operations_path(userdata_path)
+    queue_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(queue_path.with_name(queue_path.name + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield queue_path
+
+
+def queue_operations(userdata_path: Path, operations: List[dict]):
+    """Appends operations to the pending operations queue of an account."""
+    with locked_pending_operations(userdata_path) as queue_path:
+        with open(queue_path, "a", encoding="utf-8") as f:
+            for operation in operations:
+                f.write(json.dumps(operation) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def coalesce_operations(operations: List[dict]) -> List[dict]:
+    """Reduces queued operations to the ones that still have an effect.
+
+    Per tag only [add], [remove] or [remove, add] remain, with the same result
+    as applying them all in order: a second add of a tag would only report it
+    as existing, an add followed by a remove cancels out (the remove is kept in
+    case the shortcut existed before), a repeated remove is a no-op. Operations
+    without a tag are kept, so they are reported as invalid.
+    """
+    per_tag: dict = {}
+    untagged = []
+    for operation in operations:
+        tag = operation.get("appid_tag") if isinstance(operation, dict) else None
+        if not tag or operation.get("action") not in ("add", "remove"):
+            untagged.append(operation)
+            continue
+        pending = per_tag.setdefault(tag, [])
+        if operation["action"] == "remove":
+            pending[:] = [operation]
+        elif not pending or pending[-1]["action"] == "remove":
+            pending.append(operation)
+    return [operation for pending in per_tag.values() for operation in pending] + (
+        untagged
+    )
+
+
+def _group_by_render_settings(
+    operations: List[dict], default_jobs: int
+) -> List[Tuple[Optional[dict], int, List[dict]]]:
+    """Splits queued operations into runs queued with the same render settings.
 
-    shortcuts[shortcut_key_str] = shortcut_entry
-    print(f"INFO: Shortcut entry created with index {shortcut_key_str}.")
+    Returns (render settings, jobs, operations) per run, in queue order, with
+    the settings stripped from the operations. Operations queued by the same
+    command (or with the same options) end up in one run, i.e. one commit.
+    """
+    groups: List[Tuple[Optional[dict], int, List[dict]]] = []
+    for operation in operations:
+        settings, operation_jobs = None, default_jobs
+        if isinstance(operation, dict):
+            settings = operation.pop("render_settings", None)
+            operation_jobs = operation.pop("jobs", default_jobs)
+        if groups and groups[-1][:2] == (settings, operation_jobs):
+            groups[-1][2].append(operation)
+        else:
+            groups.append((settings, operation_jobs, [operation]))
+    return groups
 
-    if "shortcuts" in original_vdf_data_structure or not shortcuts_path.is_file():
-        data_to_write_back = {"shortcuts": shortcuts}
-    else:
-        data_to_write_back = shortcuts
 
-    try:
-        with open(shortcuts_path, "wb") as f:
-            vdf.binary_dump(data_to_write_back, f)
-        print(f"INFO: Successfully wrote to {shortcuts_path}.")
-    except Exception as e:
-        print(f"ERROR: Failed writing to {shortcuts_path}: {e}", file=sys.stderr)
-        return False
+def start_queue_flusher(userdata_path: Path):
+    """Starts a detached process applying the queue once Steam has exited."""
+    import subprocess
 
-    if icon_source_param:
-        if not save_steam_artwork(
-            artwork_short_id_str, icon_source_param, grid_path, watermark_logo_param
-        ):
-            print(
-                f"WARNING: Artwork saving failed, but shortcut was added.",
-                file=sys.stderr,
-            )
+    log_path = ssm_cache_dir() / "flush.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a") as log:
+        subprocess.Popen(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--action",
+                "flush",
+                "--userdata",
+                str(userdata_path),
+                "--no-daemon",
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
 
-    return True
 
+def defer_operations(
+    user_dirs: List[Path],
+    operations: List[dict],
+    watermark_logo_param: Optional[str] = None,
+    jobs: int = 1,
+):
+    """Queues operations for every account and starts a flusher for each.
 
-def remove_shortcut(userdata_path: Path, flatpak_appid_tag_to_remove: str):
-    """Removes a shortcut based on its tag."""
-    shortcuts_path = userdata_path / "config/shortcuts.vdf"
-    grid_path = userdata_path / "config/grid"
-    print(f"INFO: Removing shortcut for AppID Tag: {flatpak_appid_tag_to_remove}")
-    if not shortcuts_path.is_file():
-        print(f"INFO: {shortcuts_path} does not exist. Nothing to remove.")
+    Used while Steam is running; the operations carry the active render
+    settings and absolute paths, as they are applied later by another process.
+    """
+    for operation in operations:
+        if not isinstance(operation, dict):
+            continue
+        for path_field in ("icon", "watermark"):
+            if operation.get(path_field):
+                operation[path_field] = os.path.abspath(operation[path_field])
+        if not operation.get("watermark") and watermark_logo_param:
+            operation["watermark"] = os.path.abspath(watermark_logo_param)
+        operation["render_settings"] = render_settings()
+        operation["jobs"] = jobs
+    for userdata_path in user_dirs:
+        queue_operations(userdata_path, operations)
+        start_queue_flusher(userdata_path)
+    log_info(
+        f"Steam is running, queued {len(operations)} operation(s) for {len(user_dirs)} account(s); they are applied once Steam exits."
+    )
+
+
+def flush_pending_operations(userdata_path: Path, jobs: int = 1) -> bool:
+    """Applies the queued operations of an account once Steam is not running.
+
+    Waits for a running Steam client to exit first, then commits the
+    coalesced queue with one shortcuts.vdf write per run of operations queued
+    with the same render settings (usually one), and repeats until the queue
+    stays empty. Only one flusher runs per account; if another one is active,
+    it picks up the queue and this call returns right away.
+    """
+    queue_path = pending_operations_path(userdata_path)
+    flusher_lock = open(queue_path.with_name(queue_path.name + ".flusher"), "w")
+    try:
+        fcntl.flock(flusher_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        flusher_lock.close()
+        log_info("Another process is already flushing the queue.")
         return True
 
-    current_shortcuts = {}
-    original_vdf_structure = {}
+    all_applied = True
     try:
-        with open(shortcuts_path, "rb") as f:
-            original_vdf_structure = vdf.binary_load(f)
-            current_shortcuts = original_vdf_structure.get(
-                "shortcuts", original_vdf_structure
+        while True:
+            steam_pid = running_steam_pid()
+            if steam_pid is not None:
+                log_info(f"Waiting for Steam (pid {steam_pid}) to exit.")
+                wait_for_process_exit(steam_pid)
+                continue
+            with locked_pending_operations(userdata_path):
+                try:
+                    queued_bytes = queue_path.read_bytes()
+                except FileNotFoundError:
+                    queued_bytes = b""
+                operations = [
+                    json.loads(line)
+                    for line in queued_bytes.decode("utf-8").splitlines()
+                    if line.strip()
+                ]
+                if not operations:
+                    queue_path.unlink(missing_ok=True)
+                    # Released under the queue lock: anything queued after this
+                    # point starts a new flusher.
+                    flusher_lock.close()
+                    return all_applied
+            coalesced = coalesce_operations(operations)
+            log_info(
+                f"Applying {len(coalesced)} of {len(operations)} queued operation(s)."
             )
-            if not isinstance(current_shortcuts, dict):
-                current_shortcuts = {}
-    except Exception as e:
-        print(
-            f"ERROR: Failed reading {shortcuts_path} for removal: {e}", file=sys.stderr
-        )
-        return False
+            for group_settings, group_jobs, group in _group_by_render_settings(
+                coalesced, jobs
+            ):
+                if group_settings is not None:
+                    restore_render_settings(group_settings)
+                results = apply_manifest(userdata_path, group, None, group_jobs)
+                if any(result["status"] in FAILED_STATUSES for result in results):
+                    all_applied = False
+            # Only dropped once committed: a flusher killed before this point
+            # leaves the queue in place, and applying it again is harmless.
+            _drop_applied_operations(userdata_path, len(queued_bytes))
+    finally:
+        flusher_lock.close()
 
-    shortcut_key_to_delete = None
-    shortcut_entry_to_delete = None
-    tag_to_find_for_removal = f"{TAG_PREFIX}_{flatpak_appid_tag_to_remove}"
 
-    for key, entry_dict in list(current_shortcuts.items()):
-        if (
-            isinstance(entry_dict, dict)
-            and tag_to_find_for_removal in entry_dict.get("tags", {}).values()
-        ):
-            shortcut_key_to_delete = key
-            shortcut_entry_to_delete = entry_dict
-            break
+def _drop_applied_operations(userdata_path: Path, applied_length: int):
+    """Removes the first 'applied_length' bytes (applied lines) from the queue.
 
-    if shortcut_key_to_delete and shortcut_entry_to_delete:
-        exe_for_artwork_id = shortcut_entry_to_delete.get("Exe", "").strip('"')
-        name_for_artwork_id = shortcut_entry_to_delete.get("AppName", "").strip('"')
-        del current_shortcuts[shortcut_key_to_delete]
-        print(
-            f"INFO: Shortcut with tag '{tag_to_find_for_removal}' (Index: {shortcut_key_to_delete}) removed from list."
-        )
+    Operations appended meanwhile follow them and stay queued.
+    """
+    with locked_pending_operations(userdata_path) as queue_path:
+        try:
+            remaining_bytes = queue_path.read_bytes()[applied_length:]
+        except FileNotFoundError:
+            return
+        if not remaining_bytes:
+            queue_path.unlink()
+            return
+        temp_path = queue_path.with_name(f".{queue_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as f:
+            f.write(remaining_bytes)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, queue_path)
 
-        if "shortcuts" in original_vdf_structure:
-            data_to_write_back_after_delete = {"shortcuts": current_shortcuts}
-        else:
-            data_to_write_back_after_delete = current_shortcuts
 
+def cli_operations(args: argparse.Namespace) -> List[dict]:
+    """Returns the operations of an add, remove or apply command line.
+
+    Exits with code 2 if the --manifest cannot be loaded.
+    """
+    if args.action == "apply":
         try:
-            with open(shortcuts_path, "wb") as f:
-                vdf.binary_dump(data_to_write_back_after_delete, f)
-            print(f"INFO: {shortcuts_path} successfully updated after removal.")
+            return load_manifest(Path(args.manifest))
         except Exception as e:
             print(
-                f"ERROR: Failed writing to {shortcuts_path} after removal: {e}",
-                file=sys.stderr,
+                f"ERROR: Could not load manifest {args.manifest}: {e}", file=sys.stderr
             )
-            return False
+            sys.exit(2)
+    return [
+        {
+            "action": args.action,
+            "appid_tag": args.appid_tag,
+            "name": args.name,
+            "icon": args.icon,
+            "exe": args.exe,
+            "params": args.params,
+        }
+    ]
 
-        if exe_for_artwork_id and name_for_artwork_id:
-            try:
-                artwork_appid_str_to_delete = generate_short_appid_for_artwork(
-                    exe_for_artwork_id, name_for_artwork_id
+
+def default_socket_path() -> Path:
+    """Returns the Unix socket path of the daemon for the current user."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / DAEMON_SOCKET_NAME
+    return ssm_cache_dir() / DAEMON_SOCKET_NAME
+
+
+class ShortcutsDaemonState:
+    """Warm state of the daemon: the parsed shortcuts of one Steam user.
+
+    The parsed shortcuts are kept in memory together with the mtime, size and
+    inode of shortcuts.vdf at load time, and are dropped as soon as the file
+    changes on disk (checked on every request and polled while idle).
+    """
+
+    def __init__(self, userdata_path: Path, watermark_logo_param: Optional[str] = None):
+        self.userdata_path = userdata_path
+        self.shortcuts_path = userdata_path / "config/shortcuts.vdf"
+        self.grid_path = userdata_path / "config/grid"
+        self.watermark_logo_param = watermark_logo_param
+        self.shortcuts: Optional[dict] = None
+        self.wrapped = True
+        self.stamp: Optional[List[int]] = None
+
+    def _current_stamp(self) -> Optional[List[int]]:
+        try:
+            return file_stamp(self.shortcuts_path)
+        except FileNotFoundError:
+            return None
+
+    def invalidate_if_changed(self):
+        """Drops the parsed shortcuts if shortcuts.vdf changed on disk."""
+        if self.shortcuts is not None and self._current_stamp() != self.stamp:
+            log_info(f"{self.shortcuts_path} changed on disk, reloading.")
+            self.shortcuts = None
+
+    def _loaded_shortcuts(self) -> dict:
+        self.invalidate_if_changed()
+        if self.shortcuts is None:
+            self.stamp = self._current_stamp()
+            self.shortcuts, self.wrapped = load_shortcuts_vdf(self.shortcuts_path)
+        return self.shortcuts
+
+    def handle(self, request: dict) -> dict:
+        """Handles a single request and returns the response."""
+        action = request.get("action")
+        if request.get("userdata") and not self.userdata_path.samefile(
+            request["userdata"]
+        ):
+            return {"exit_code": 2, "status": "other_userdata"}
+        if (
+            action == "add"
+            and "render_settings" in request
+            and not same_render_output(request["render_settings"], render_settings())
+        ):
+            # The client wants other artwork than this daemon's options render.
+            return {"exit_code": 2, "status": "other_settings"}
+        shortcuts = self._loaded_shortcuts()
+
+        if action == "list":
+            entries = [
+                {
+                    "key": key,
+                    "appid_tag": entry.get("FlatpakAppID", ""),
+                    "name": entry.get("AppName", ""),
+                    "exe": entry.get("Exe", ""),
+                    "params": entry.get("LaunchOptions", ""),
+                }
+                for key, entry in shortcuts.items()
+                if isinstance(entry, dict)
+                and any(
+                    str(tag).startswith(f"{TAG_PREFIX}_")
+                    for tag in entry.get("tags", {}).values()
                 )
-                print(
-                    f"INFO: Attempting to delete artwork for Short AppID {artwork_appid_str_to_delete}"
+            ]
+            return {"exit_code": 0, "status": "ok", "shortcuts": entries}
+
+        if action == "check":
+            tag_to_find = f"{TAG_PREFIX}_{request.get('appid_tag')}"
+            found = find_shortcut_key_by_tag(shortcuts, tag_to_find) is not None
+            log_info(f"Shortcut {'found' if found else 'not found'}.")
+            return {"exit_code": 0 if found else 1, "status": "ok", "found": found}
+
+        if action not in ("add", "remove"):
+            return {"exit_code": 2, "status": "invalid", "message": "bad action"}
+
+        outcome: dict = {}
+
+        def apply_request(shortcuts: dict) -> bool:
+            removed_key = find_shortcut_key_by_tag(
+                shortcuts, f"{TAG_PREFIX}_{request.get('appid_tag')}"
+            )
+            outcome["removed_entry"] = (
+                shortcuts.get(removed_key)
+                if action == "remove" and removed_key
+                else None
+            )
+            outcome["status"], outcome["message"] = _apply_operation(
+                shortcuts, self.grid_path, request, build_appid_map(shortcuts)
+            )
+            return outcome["status"] in ("added", "removed")
+
+        try:
+            # A commit by another process since the last load is merged by
+            # re-applying the request to the re-read file.
+            shortcuts, written = update_shortcuts_vdf(
+                self.shortcuts_path,
+                apply_request,
+                (shortcuts, self.wrapped, self.stamp),
+            )
+        except Exception as e:
+            self.shortcuts = None
+            print(f"ERROR: Failed writing to {self.shortcuts_path}: {e}")
+            return {"exit_code": 1, "status": "failed", "message": str(e)}
+        status, message = outcome["status"], outcome["message"]
+        removed_entry = outcome["removed_entry"]
+        log_info(f"{action} '{request.get('appid_tag')}': {status} ({message})")
+        if not written and shortcuts is not self.shortcuts:
+            # Re-read under the lock, but nothing left to write.
+            self.shortcuts = None
+        if status == "invalid":
+            return {"exit_code": 2, "status": status, "message": message}
+        if status == "collision":
+            return {"exit_code": 1, "status": status, "message": message}
+        if not written:
+            return {"exit_code": 0, "status": status, "message": message}
+        self.shortcuts = shortcuts
+        self.stamp = self._current_stamp()
+        log_info(f"Successfully wrote to {self.shortcuts_path}.")
+
+        if removed_entry is not None:
+            delete_shortcut_artwork(self.grid_path, removed_entry)
+        elif request.get("icon"):
+            shortcut_entry = shortcuts[
+                find_shortcut_key_by_tag(
+                    shortcuts, f"{TAG_PREFIX}_{request['appid_tag']}"
                 )
-                art_patterns_to_delete = [
-                    f"{artwork_appid_str_to_delete}.png",
-                    f"{artwork_appid_str_to_delete}.jpg",
-                    f"{artwork_appid_str_to_delete}p.png",
-                    f"{artwork_appid_str_to_delete}p.jpg",
-                    f"{artwork_appid_str_to_delete}_hero.png",
-                    f"{artwork_appid_str_to_delete}_hero.jpg",
-                    f"{artwork_appid_str_to_delete}_icon.png",
-                    f"{artwork_appid_str_to_delete}_icon.jpg",
-                    f"{artwork_appid_str_to_delete}_logo.png",
-                    f"{artwork_appid_str_to_delete}_logo.jpg",
-                ]
-                for pattern in art_patterns_to_delete:
-                    art_path = grid_path / pattern
-                    if art_path.is_file():
-                        print(f"INFO: Deleting artwork: {art_path}")
-                        art_path.unlink()
-            except Exception as e_art:
-                print(f"WARNING: Failed to delete artwork: {e_art}", file=sys.stderr)
-        return True
-    else:
-        print(
-            f"INFO: No shortcut with tag '{tag_to_find_for_removal}' found for removal."
-        )
-        return True
+                or ""
+            ]
+            if not save_steam_artwork(
+                generate_short_appid_for_artwork(
+                    shortcut_entry["Exe"].strip('"'),
+                    shortcut_entry["AppName"].strip('"'),
+                ),
+                request["icon"],
+                self.grid_path,
+                request.get("watermark") or self.watermark_logo_param,
+            ):
+                print("WARNING: Artwork saving failed, but shortcut was added.")
+        return {"exit_code": 0, "status": status, "message": message}
 
 
-def check_shortcut(userdata_path: Path, flatpak_appid_tag_to_check: str):
-    """Checks if a shortcut with the given tag exists."""
-    shortcuts_path = userdata_path / "config/shortcuts.vdf"
-    print(f"INFO: Checking for shortcut with AppID Tag: {flatpak_appid_tag_to_check}")
-    if not shortcuts_path.is_file():
-        print("INFO: shortcuts.vdf does not exist.")
-        return False
+def _make_daemon_server(socket_path: Path, daemon_state: ShortcutsDaemonState) -> Any:
+    """Creates the single threaded Unix socket server of the daemon.
+
+    Requests are JSON lines, handled one after another; each is answered with a
+    JSON line. socketserver is only imported here, when serving.
+    """
+    import socketserver
+
+    class DaemonRequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                global LOG_LEVEL
+                output = io.StringIO()
+                daemon_log_level = LOG_LEVEL
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    # The output goes back to the client, at the client's level.
+                    LOG_LEVEL = LOG_LEVELS.get(request.get("log_level"), LOG_LEVEL)
+                    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(
+                        output
+                    ):
+                        response = daemon_state.handle(request)
+                except Exception as e:
+                    response = {"exit_code": 2, "status": "error", "message": str(e)}
+                finally:
+                    LOG_LEVEL = daemon_log_level
+                response["output"] = output.getvalue()
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                self.wfile.flush()
+
+    class DaemonServer(socketserver.UnixStreamServer):
+        def service_actions(self):
+            # Called by serve_forever() on every poll interval: mtime polling.
+            daemon_state.invalidate_if_changed()
+
+    return DaemonServer(str(socket_path), DaemonRequestHandler)
 
-    shortcuts = {}
+
+def serve(socket_path: Path, daemon_state: ShortcutsDaemonState) -> int:
+    """Runs the daemon on a Unix domain socket until SIGTERM or Ctrl+C."""
+    if socket_path.exists():
+        if forward_to_daemon(socket_path, {"action": "list"}) is not None:
+            print(
+                f"ERROR: A daemon is already listening on {socket_path}.",
+                file=sys.stderr,
+            )
+            return 1
+        socket_path.unlink()
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    previous_umask = os.umask(0o077)
     try:
-        with open(shortcuts_path, "rb") as f:
-            loaded_data = vdf.binary_load(f)
-            shortcuts = loaded_data.get("shortcuts", loaded_data)
-            if not isinstance(shortcuts, dict):
-                shortcuts = {}
-    except Exception as e:
-        print(f"ERROR: Failed reading {shortcuts_path} for check: {e}", file=sys.stderr)
-        return False
+        server = _make_daemon_server(socket_path, daemon_state)
+    finally:
+        os.umask(previous_umask)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    log_info(f"Serving {daemon_state.userdata_path} on {socket_path}.")
+    sys.stdout.flush()
+    try:
+        server.serve_forever(poll_interval=DAEMON_POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+    return 0
 
-    tag_to_find_for_check = f"{TAG_PREFIX}_{flatpak_appid_tag_to_check}"
-    for entry_dict in shortcuts.values():
-        if (
-            isinstance(entry_dict, dict)
-            and tag_to_find_for_check in entry_dict.get("tags", {}).values()
-        ):
-            print(f"INFO: Shortcut found.")
-            return True
 
-    print(f"INFO: Shortcut not found.")
-    return False
+def forward_to_daemon(socket_path: Path, request: dict) -> Optional[dict]:
+    """Sends a request to a running daemon.
 
+    Returns the daemon's response, or None if no daemon is reachable (or it went
+    away or did not answer within DAEMON_REQUEST_TIMEOUT), in which case the
+    caller runs the action itself.
+    """
+    if not socket_path.exists():
+        return None
+    import socket
 
-if __name__ == "__main__":
-    _init_crc32_tab_manual()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(DAEMON_CONNECT_TIMEOUT)
+            client.connect(str(socket_path))
+            client.settimeout(DAEMON_REQUEST_TIMEOUT)
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with client.makefile("rb") as response_stream:
+                response_line = response_stream.readline()
+    except socket.timeout:
+        print(
+            f"WARNING: The daemon on {socket_path} did not answer within {DAEMON_REQUEST_TIMEOUT:.0f}s, running the action in this process.",
+            file=sys.stderr,
+        )
+        return None
+    except OSError:
+        return None
+    if not response_line:
+        return None
+    return json.loads(response_line)
 
+
+def build_parser() -> argparse.ArgumentParser:
+    """Returns the command line parser."""
     parser = argparse.ArgumentParser(
         description="Manage Steam non-game shortcuts with enhanced artwork generation.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
     parser.add_argument(
         "--action",
-        choices=["add", "remove", "check"],
-        required=True,
-        help="Action to perform.",
+        choices=[
+            "add",
+            "remove",
+            "check",
+            "apply",
+            "sync",
+            "verify",
+            "gc",
+            "discover",
+            "flush",
+            "list",
+        ],
+        help="Action to perform. Required unless --serve or --stdin-jsonl is given.",
     )
     parser.add_argument(
         "--appid_tag",
-        required=True,
-        help=f"Unique tag for the app (e.g., Flatpak App ID like 'com.brave.Browser'). Used for the '{TAG_PREFIX}_' tag.",
+        help=(
+            "Unique tag for the app (e.g., Flatpak App ID like 'com.brave.Browser'). "
+            f"Used for the '{TAG_PREFIX}_' tag. Required for 'add', 'remove' and "
+            "'check'."
+        ),
     )
     parser.add_argument(
         "--name", help="Display name of the app in Steam. Required for 'add'."
@@ -753,7 +4099,7 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         "--exe",
-        default="/usr/bin/flatpak",
+        default=DEFAULT_EXE,
         help="Path to the executable file (e.g., '/usr/bin/flatpak').",
     )
     parser.add_argument(
@@ -765,36 +4111,561 @@ if __name__ == "__main__":
         dest="watermark_logo_path",
         help="Optional: Path to your watermark logo for branding on generated artwork.",
     )
+    parser.add_argument(
+        "--manifest",
+        help="Path to a JSON manifest of add/remove operations. Required for 'apply'.",
+    )
+    parser.add_argument(
+        "--state",
+        help="Path to a JSON list of the desired shortcuts. Required for 'sync'.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes rendering artwork for 'apply' (0 uses all CPU cores).",
+    )
+
+    parser.add_argument(
+        "--gc-scope",
+        choices=["ssm", "all"],
+        default="ssm",
+        help=(
+            "For 'gc': 'ssm' only collects artwork generated by this tool, 'all' "
+            "collects artwork of any non-Steam shortcut that no longer exists."
+        ),
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="For 'gc' and 'sync': only report what would change, write nothing.",
+    )
+    parser.add_argument(
+        "--tag-prefix",
+        help="For 'list': only shortcuts managed by this tool whose appid_tag starts with this prefix.",
+    )
+    parser.add_argument(
+        "--ssm-only",
+        action="store_true",
+        help="For 'list': only shortcuts managed by this tool.",
+    )
+    parser.add_argument(
+        "--exe-contains",
+        help="For 'list': only shortcuts whose Exe contains this text (case-insensitive).",
+    )
+    parser.add_argument(
+        "--name-contains",
+        help="For 'list': only shortcuts whose name contains this text (case-insensitive).",
+    )
+    parser.add_argument(
+        "--fields",
+        default=",".join(LIST_DEFAULT_FIELDS),
+        help=f"For 'list': comma-separated fields to output. Available: {', '.join(LIST_FIELDS)}.",
+    )
+    parser.add_argument(
+        "--count",
+        action="store_true",
+        help="For 'list': only output the number of matching shortcuts.",
+    )
+    parser.add_argument(
+        "--userdata",
+        help=(
+            "Steam userdata directory of the account to manage (e.g. "
+            "~/.local/share/Steam/userdata/12345). Skips the discovery of the active "
+            "account."
+        ),
+    )
+    parser.add_argument(
+        "--all-users",
+        action="store_true",
+        help="Apply the action to every Steam account on this machine, concurrently.",
+    )
+    parser.add_argument(
+        "--artwork-profile",
+        choices=list(ARTWORK_ENCODER_PROFILES),
+        default="default",
+        help=(
+            "Artwork encoder profile: 'default' writes PNG at zlib level 6, 'fast' "
+            "writes JPEG for the opaque header, portrait and hero and fast PNG for "
+            "the icon and logo, 'small' writes JPEG and optimized PNG."
+        ),
+    )
+    parser.add_argument(
+        "--artwork-format",
+        action="append",
+        default=[],
+        metavar="TARGET=FORMAT",
+        help=(
+            "Output format of one artwork target, overriding the profile. Targets: "
+            f"{', '.join(TARGET_SIZES)}. Formats: {', '.join(ARTWORK_FORMATS)} "
+            "(icon_square and logo_steam need png)."
+        ),
+    )
+    parser.add_argument(
+        "--png-compress-level",
+        type=int,
+        choices=range(10),
+        metavar="0-9",
+        help="zlib compression level of PNG artwork, overriding the profile.",
+    )
+    parser.add_argument(
+        "--jpeg-quality",
+        type=int,
+        help="Quality (1-95) of JPEG artwork, overriding the profile.",
+    )
+    parser.add_argument(
+        "--optimize",
+        action=argparse.BooleanOptionalAction,
+        help="Let the PNG/JPEG encoders optimize for size (slower). --no-optimize turns it off for the 'small' profile.",
+    )
+    parser.add_argument(
+        "--gradient",
+        choices=["default", "adaptive"],
+        default="default",
+        help=(
+            "Background gradient of the artwork: the fixed dark blue one, or "
+            "'adaptive' dark shades of the logo's dominant color."
+        ),
+    )
+    parser.add_argument(
+        "--render-threads",
+        type=int,
+        default=0,
+        help="Threads rendering and encoding the artwork targets of one app in parallel. 0 uses one per CPU core (at most 5).",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help=(
+            "Print the time spent per phase (discovery, VDF load/lookup/write, "
+            "artwork resize/composite/encode) at exit. Runs the action in this "
+            "process."
+        ),
+    )
+    parser.add_argument(
+        "--trace-file",
+        help="Write the recorded phases as a Chrome trace (JSON) to this file at exit. Runs the action in this process.",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=list(LOG_LEVELS),
+        default="info",
+        help=(
+            "Output level: 'quiet' prints only warnings and errors, 'info' (default) "
+            "adds progress messages, 'debug' adds DEBUG output."
+        ),
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="log_level",
+        action="store_const",
+        const="debug",
+        help="Same as --log-level debug.",
+    )
+    parser.add_argument(
+        "-q",
+        "--quiet",
+        dest="log_level",
+        action="store_const",
+        const="quiet",
+        help="Same as --log-level quiet.",
+    )
+    parser.add_argument(
+        "--defer-while-steam-running",
+        action="store_true",
+        help=(
+            "For 'add', 'remove' and 'apply': if Steam is running (it would overwrite"
+            " shortcuts.vdf on exit), queue the operations and apply them in one "
+            "commit as soon as Steam exits."
+        ),
+    )
+    parser.add_argument(
+        "--stdin-jsonl",
+        action="store_true",
+        help=(
+            "Read operations (one JSON object per line, as in --manifest) from stdin,"
+            " commit them in batches and write one JSON result line per input line to"
+            " stdout."
+        ),
+    )
+    parser.add_argument(
+        "--batch-window-ms",
+        type=float,
+        default=STDIN_BATCH_WINDOW * 1000,
+        help="For --stdin-jsonl: commit a batch this long after its first operation arrived.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=STDIN_BATCH_SIZE,
+        help="For --stdin-jsonl: commit a batch once it holds this many operations.",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a daemon answering add/remove/check/list requests on a Unix socket.",
+    )
+    parser.add_argument(
+        "--socket",
+        default=str(default_socket_path()),
+        help="Unix socket path of the daemon.",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Do not forward the action to a running daemon.",
+    )
+    return parser
+
+
+def parse_list_fields(parser: argparse.ArgumentParser, fields: str) -> List[str]:
+    """Returns the fields named by --fields, ends the program if one is unknown."""
+    list_fields = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown_fields = [field for field in list_fields if field not in LIST_FIELDS]
+    if unknown_fields or not list_fields:
+        parser.error(
+            f"--fields: unknown field(s) {', '.join(unknown_fields) or '(none given)'}; "
+            f"available: {', '.join(LIST_FIELDS)}."
+        )
+    return list_fields
+
+
+def check_action_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Ends the program through parser.error() if the action lacks an option."""
+    if args.action == "apply" and not args.manifest:
+        parser.error("--manifest is required for the 'apply' action.")
+    if args.action == "sync" and not args.state:
+        parser.error("--state is required for the 'sync' action.")
+    if args.action in ("add", "remove", "check") and not args.appid_tag:
+        parser.error(f"--appid_tag is required for the '{args.action}' action.")
+    if args.action == "add" and not all([args.name, args.icon, args.params]):
+        parser.error("--name, --icon, and --params are required for the 'add' action.")
+    if args.action == "list" and args.all_users:
+        parser.error("--all-users cannot be combined with the 'list' action.")
+
+
+def configure_artwork_encoding_from_args(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+):
+    """Sets up the artwork encoding, ends the program on an invalid --artwork-format."""
+    artwork_formats = {}
+    for target_format in args.artwork_format:
+        target_name, _, format_name = target_format.partition("=")
+        artwork_formats[target_name] = format_name.lower()
+    try:
+        configure_artwork_encoding(
+            args.artwork_profile,
+            artwork_formats,
+            args.png_compress_level,
+            args.optimize,
+            args.jpeg_quality,
+        )
+    except ValueError as e:
+        parser.error(f"--artwork-format: {e}")
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parses and validates the command line and sets up the artwork encoding.
+
+    Invalid combinations end the program through parser.error(). The parsed
+    --fields are stored as 'list_fields'.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not args.serve and not args.stdin_jsonl and not args.action:
+        parser.error("--action is required unless --serve or --stdin-jsonl is given.")
+    if args.stdin_jsonl and (args.action or args.serve or args.all_users):
+        parser.error(
+            "--stdin-jsonl cannot be combined with --action, --serve or --all-users."
+        )
+    if args.jpeg_quality is not None and not 1 <= args.jpeg_quality <= 95:
+        parser.error("--jpeg-quality must be between 1 and 95.")
+    if args.render_threads < 0:
+        parser.error("--render-threads must not be negative.")
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1.")
+    check_action_args(parser, args)
+
+    args.list_fields = parse_list_fields(parser, args.fields)
+
+    if args.userdata and not os.path.isdir(args.userdata):
+        parser.error(f"--userdata {args.userdata} is not a directory.")
+    if args.all_users and (args.serve or args.userdata):
+        parser.error("--all-users cannot be combined with --serve or --userdata.")
+
+    configure_artwork_encoding_from_args(parser, args)
+    return args
+
+
+def configure_from_args(args: argparse.Namespace):
+    """Applies the render, output level and tracing options."""
+    global LOG_LEVEL
+    configure_render_threads(args.render_threads)
+    configure_gradient(args.gradient == "adaptive")
+    LOG_LEVEL = LOG_LEVELS[args.log_level]
+    if args.timings or args.trace_file:
+        import atexit
+
+        enable_tracing()
+        if args.trace_file:
+            atexit.register(write_trace_file, Path(args.trace_file))
+        if args.timings:
+            atexit.register(print_timings)
+
+
+def load_state_or_exit(args: argparse.Namespace) -> List[dict]:
+    """Returns the desired shortcuts of --state, exits with code 2 if unreadable."""
+    try:
+        return load_desired_state(Path(args.state))
+    except Exception as e:
+        print(f"ERROR: Could not load state {args.state}: {e}", file=sys.stderr)
+        sys.exit(2)
+
+
+# The run_* functions carry out one action on one account and return the exit
+# code. They share a signature, so ACTION_RUNNERS can dispatch to them;
+# 'output_stream' only receives the output of 'list'.
+
+
+def run_add(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action add."""
+    success = add_shortcut(
+        userdata_dir,
+        args.appid_tag,
+        args.name,
+        args.exe,
+        args.params,
+        args.icon,
+        args.watermark_logo_path,
+    )
+    return 0 if success else 1
+
+
+def run_remove(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action remove."""
+    return 0 if remove_shortcut(userdata_dir, args.appid_tag) else 1
+
+
+def run_check(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action check: 0 if the shortcut exists."""
+    return 0 if check_shortcut(userdata_dir, args.appid_tag) else 1
+
+
+def run_apply(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action apply."""
+    results = apply_manifest(
+        userdata_dir, cli_operations(args), args.watermark_logo_path, args.jobs
+    )
+    failed = [r for r in results if r["status"] in FAILED_STATUSES]
+    return 0 if not failed else 1
+
+
+def run_sync(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action sync."""
+    success = sync_shortcuts(
+        userdata_dir,
+        load_state_or_exit(args),
+        args.watermark_logo_path,
+        args.jobs,
+        args.dry_run,
+    )
+    return 0 if success else 1
+
+
+def run_list(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action list, writing the shortcuts to 'output_stream'."""
+    try:
+        listed = list_shortcuts(
+            userdata_dir,
+            args.tag_prefix,
+            args.ssm_only,
+            args.exe_contains,
+            args.name_contains,
+            args.list_fields,
+            args.count,
+            output_stream,
+        )
+    except BrokenPipeError:
+        # Keep the interpreter from failing to flush stdout at exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), output_stream.fileno())
+        listed = 0
+    return 0 if listed is not None else 1
+
 
-    args = parser.parse_args()
+def run_verify(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action verify."""
+    return 0 if verify_shortcuts(userdata_dir) else 1
 
-    userdata_dir = find_steam_userdata_path()
+
+def run_flush(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action flush."""
+    return 0 if flush_pending_operations(userdata_dir, args.jobs) else 1
+
+
+def run_gc(args: argparse.Namespace, userdata_dir: Path, output_stream: Any) -> int:
+    """Runs --action gc."""
+    success = collect_artwork_garbage(userdata_dir, args.gc_scope, args.dry_run)
+    return 0 if success else 1
+
+
+ACTION_RUNNERS = {
+    "add": run_add,
+    "remove": run_remove,
+    "check": run_check,
+    "apply": run_apply,
+    "sync": run_sync,
+    "list": run_list,
+    "verify": run_verify,
+    "flush": run_flush,
+    "gc": run_gc,
+}
+
+
+def run_discover() -> int:
+    """Runs --action discover: prints the installed Flatpak apps as JSON."""
+    discovered_apps = discover_flatpaks()
+    print(json.dumps(discovered_apps, indent=1))
+    if not discovered_apps:
+        print("WARNING: No installed Flatpak apps found.", file=sys.stderr)
+    return 0 if discovered_apps else 1
+
+
+def run_all_users(args: argparse.Namespace) -> int:
+    """Runs the action for every Steam account on this machine (--all-users).
+
+    add, remove and apply run as one transaction per account, with the artwork
+    rendered once for all of them; other actions run account by account.
+    """
+    with span("discovery"):
+        user_dirs = [candidate["path"] for candidate in find_steam_user_dirs()]
+    if not user_dirs:
+        print("ERROR: No Steam userdata directories found.", file=sys.stderr)
+        return 1
+    log_info(f"Applying '{args.action}' to {len(user_dirs)} Steam account(s).")
+    if args.action in ("add", "remove", "apply"):
+        operations = cli_operations(args)
+        if args.defer_while_steam_running and running_steam_pid() is not None:
+            defer_operations(user_dirs, operations, args.watermark_logo_path, args.jobs)
+            return 0
+        results = apply_manifest_all_users(
+            user_dirs, operations, args.watermark_logo_path, args.jobs
+        )
+        failed = [r for r in results if r["status"] in FAILED_STATUSES]
+        return 0 if not failed else 1
+    if args.action == "sync":
+        # Fail once, before touching any account, if the state is unreadable.
+        load_state_or_exit(args)
+    exit_codes = [
+        ACTION_RUNNERS[args.action](args, user_dir, sys.stdout)
+        for user_dir in user_dirs
+    ]
+    if args.action == "check":
+        log_info(f"Shortcut found in {exit_codes.count(0)}/{len(user_dirs)} accounts.")
+    return max(exit_codes)
+
+
+def forward_action(args: argparse.Namespace) -> Optional[int]:
+    """Lets a running daemon carry out the action, if one can.
+
+    Returns the daemon's exit code after writing its output, or None if the
+    action has to run in this process.
+    """
+    if (
+        args.serve
+        or args.no_daemon
+        or _trace_events is not None
+        or args.defer_while_steam_running
+        or args.action not in DAEMON_ACTIONS
+    ):
+        return None
+    daemon_response = forward_to_daemon(
+        Path(args.socket),
+        {
+            "action": args.action,
+            "appid_tag": args.appid_tag,
+            "name": args.name,
+            "icon": os.path.abspath(args.icon) if args.icon else None,
+            "exe": args.exe,
+            "params": args.params,
+            "watermark": (
+                os.path.abspath(args.watermark_logo_path)
+                if args.watermark_logo_path
+                else None
+            ),
+            "userdata": os.path.abspath(args.userdata) if args.userdata else None,
+            "render_settings": render_settings(),
+            "log_level": args.log_level,
+        },
+    )
+    # A daemon serving another account, or rendering with other options,
+    # leaves the action to this process.
+    if daemon_response is None or daemon_response.get("status") in (
+        "other_userdata",
+        "other_settings",
+    ):
+        return None
+    sys.stdout.write(daemon_response.get("output", ""))
+    return daemon_response.get("exit_code", 1)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs the command line tool and returns its exit code."""
+    args = parse_args(argv)
+    configure_from_args(args)
+
+    if args.action == "discover":
+        return run_discover()
+    if args.all_users:
+        return run_all_users(args)
+    forwarded_exit_code = forward_action(args)
+    if forwarded_exit_code is not None:
+        return forwarded_exit_code
+
+    json_output = sys.stdout
+    if args.stdin_jsonl or args.action == "list":
+        # stdout only carries the JSON lines, everything else goes to stderr.
+        sys.stdout = sys.stderr
+
+    userdata_dir: Optional[Path]
+    if args.userdata:
+        userdata_dir = Path(args.userdata)
+    else:
+        userdata_dir = find_steam_userdata_path()
     if not userdata_dir:
         print("ERROR: Steam userdata directory not found.", file=sys.stderr)
-        sys.exit(1)
+        return 1
 
-    exit_code = 1
+    if args.serve:
+        return serve(
+            Path(args.socket),
+            ShortcutsDaemonState(userdata_dir, args.watermark_logo_path),
+        )
 
-    if args.action == "add":
-        if not all([args.name, args.icon, args.params]):
-            parser.error(
-                "--name, --icon, and --params are required for the 'add' action."
-            )
-        success = add_shortcut(
+    if (
+        args.defer_while_steam_running
+        and args.action in ("add", "remove", "apply")
+        and running_steam_pid() is not None
+    ):
+        defer_operations(
+            [userdata_dir], cli_operations(args), args.watermark_logo_path, args.jobs
+        )
+        return 0
+
+    if args.stdin_jsonl:
+        success = run_stdin_pipeline(
             userdata_dir,
-            args.appid_tag,
-            args.name,
-            args.exe,
-            args.params,
-            args.icon,
             args.watermark_logo_path,
+            args.jobs,
+            args.batch_window_ms / 1000,
+            args.batch_size,
+            output_stream=json_output,
         )
-        exit_code = 0 if success else 1
-    elif args.action == "remove":
-        success = remove_shortcut(userdata_dir, args.appid_tag)
-        exit_code = 0 if success else 1
-    elif args.action == "check":
-        found = check_shortcut(userdata_dir, args.appid_tag)
-        exit_code = 0 if found else 1
+        return 0 if success else 1
+
+    return ACTION_RUNNERS[args.action](args, userdata_dir, json_output)
 
-    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    sys.exit(main())